@@ -1,16 +1,28 @@
 from flask import Flask, request
 from twilio.rest import Client
+from twilio.http.async_http_client import AsyncTwilioHttpClient
 from twilio.twiml.voice_response import VoiceResponse
 import requests
+import aiohttp
+import asyncio
 import datetime
+import fcntl
+import hashlib
+import hmac
 import os
 import json
 import re
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from fuzzywuzzy import fuzz
 import logging
-import langdetect
-from collections import deque
+import math
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from collections import Counter, OrderedDict, deque
 from dateutil.relativedelta import relativedelta
 
 app = Flask(__name__)
@@ -27,16 +39,22 @@ TWILIO_NUMBER = os.getenv("TWILIO_NUMBER", "+19853799364")
 
 # Owner's Phone Number for Notifications
 OWNER_PHONE = os.getenv("OWNER_PHONE", "+15049090355")
+# Shared secret for the owner's endpoints (sent as "Authorization: Bearer <token>"); they refuse every request while it's unset
+OWNER_API_TOKEN = os.getenv("OWNER_API_TOKEN")
 
 # xAI API Credentials
 XAI_API_KEY = os.getenv("XAI_API_KEY", "xai-MRHpt2WdHOo1S1DSpLsdzXEDBoOpzBagOAAh4BB14NnEcVoGkzsasVgAUfC3RN1LLgkj7CpVBda4v0oS")
+XAI_API_URL = "https://api.x.ai/v1/chat/completions"
 
 # Rent Manager API Credentials
 RENT_MANAGER_USERNAME = os.getenv("RENT_MANAGER_USERNAME")
 RENT_MANAGER_PASSWORD = os.getenv("RENT_MANAGER_PASSWORD")
 RENT_MANAGER_LOCATION_ID = os.getenv("RENT_MANAGER_LOCATION_ID", "1")
+# Comma-separated Rent Manager locations loaded into one roster (defaults to RENT_MANAGER_LOCATION_ID alone)
+RENT_MANAGER_LOCATION_IDS = [location_id.strip() for location_id in os.getenv("RENT_MANAGER_LOCATION_IDS", RENT_MANAGER_LOCATION_ID).split(",") if location_id.strip()]
 RENT_MANAGER_AUTH_URL = "https://shadynook.api.rentmanager.com/Authentication/AuthorizeUser"
-RENT_MANAGER_BASE_URL = "https://shadynook.api.rentmanager.com/Tenants?embeds=Property,Property.Addresses,Addresses,Leases.Unit.UnitType,Balance&filters=Status,eq,Current"
+RENT_MANAGER_BASE_URL = "https://shadynook.api.rentmanager.com/Tenants?embeds=Addresses,Leases.Unit,Balance,Contacts.PhoneNumbers&filters=Status,eq,Current"
+RENT_MANAGER_PROPERTIES_URL = "https://shadynook.api.rentmanager.com/Properties?embeds=Addresses"
 
 # Testing Mode (set to True to disable actual SMS sends)
 TESTING_MODE = os.getenv("TESTING_MODE", "False").lower() == "true"
@@ -45,15 +63,604 @@ TESTING_MODE = os.getenv("TESTING_MODE", "False").lower() == "true"
 PARK_OFFICE_PHONE = "(504) 313-0024"
 PARK_OFFICE_HOURS = "Monday to Friday, 9 AM to 5 PM"
 
-# Global variable to store the API token
-RENT_MANAGER_API_TOKEN = None
+# Language detection settings (ParkBot only distinguishes English from Spanish)
+LANGUAGE_CACHE_SIZE = int(os.getenv("LANGUAGE_CACHE_SIZE", "2048"))
+LANGUAGE_SWITCH_MIN_CONFIDENCE = float(os.getenv("LANGUAGE_SWITCH_MIN_CONFIDENCE", "0.75"))
+# Replies shorter than this ("no", "yes", "ok thanks") never switch a conversation's language
+LANGUAGE_SWITCH_MIN_WORDS = int(os.getenv("LANGUAGE_SWITCH_MIN_WORDS", "3"))
+
+# Words that are a strong signal for one language in tenant texts (ambiguous words like "no" are left out)
+ENGLISH_KEYWORDS = {
+    "hi", "hello", "hey", "thanks", "thank", "you", "please", "yes", "bye", "goodbye", "the", "is", "are", "was",
+    "this", "that", "my", "i", "im", "i'm", "what", "when", "where", "how", "why", "can", "could", "need", "want",
+    "help", "have", "has", "do", "does", "did", "will", "would", "not", "name", "it", "and", "of", "to", "with",
+    "for", "from", "there", "here", "rent", "pay", "paid", "balance", "due", "water", "power", "leak", "leaking",
+    "fix", "broken", "unit", "lot", "sink", "toilet", "month", "last", "statement", "done", "much", "all", "good",
+    "morning", "afternoon", "evening", "still", "out", "again"
+}
+SPANISH_KEYWORDS = {
+    "hola", "buenos", "buenas", "dias", "tardes", "noches", "gracias", "por", "favor", "que", "mi", "mis", "es",
+    "soy", "estoy", "esta", "tengo", "tiene", "necesito", "quiero", "cuanto", "cuando", "donde", "como", "pagar",
+    "pago", "pague", "renta", "saldo", "debo", "agua", "luz", "fuga", "arreglar", "roto", "rota", "lote", "unidad",
+    "el", "los", "las", "una", "de", "del", "y", "con", "para", "si", "adios", "nombre", "llamo", "mes", "pasado",
+    "ayuda", "problema", "bano", "fregadero", "hay", "cual", "estado", "cuenta", "eso", "todo", "terminado", "pero",
+    "tambien", "ya", "muy", "se", "lo", "le", "nada", "ahora", "otra", "vez"
+}
+
+# Small sample corpora used to train the character trigram model at startup
+LANGUAGE_SAMPLES = {
+    "en": (
+        "hi this is my unit number what is my balance when is my rent due how much do i owe "
+        "i paid my rent last month can you send me my statement please my sink is leaking "
+        "the power is out in my home the toilet is clogged and needs to be fixed thank you "
+        "that's all i need goodbye who do i make the check out to where is the drop box "
+        "hello my name is john and i live in lot five my water heater is broken again "
+        "is there a late fee if i pay after the fifth thanks for your help have a good day"
+    ),
+    "es": (
+        "hola soy yo cual es mi saldo cuando vence mi renta cuanto debo este mes "
+        "ya pague la renta el mes pasado me puede mandar mi estado de cuenta por favor "
+        "el fregadero tiene una fuga no hay luz en mi casa el baño esta tapado y hay que arreglarlo "
+        "muchas gracias eso es todo lo que necesito adios a nombre de quien hago el cheque "
+        "donde esta el buzon hola me llamo juan y vivo en el lote cinco el calentador de agua se rompio otra vez "
+        "hay un cargo por pagar tarde despues del cinco gracias por su ayuda que tenga buen dia"
+    )
+}
+SPANISH_ONLY_CHARACTERS = set("ñáéíóúü")
+
+# Character trigram model, built once at startup by warm_up_language_detection()
+LANGUAGE_MODEL = None
+
+# Lowercase the text and strip everything except letters and single spaces
+def normalize_language_text(text):
+    text = text.lower()
+    cleaned = "".join(char if char.isalpha() or char == "'" else " " for char in text)
+    return " ".join(cleaned.split())
+
+# Remove accents so "días" and "dias" match the same keyword
+def strip_accents(text):
+    return "".join(char for char in unicodedata.normalize("NFD", text) if unicodedata.category(char) != "Mn")
+
+def extract_trigrams(text):
+    padded = f" {strip_accents(text)} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+# Build add-one smoothed trigram log probabilities for each language
+def build_language_model():
+    model = {}
+    for language, sample in LANGUAGE_SAMPLES.items():
+        counts = Counter(extract_trigrams(normalize_language_text(sample)))
+        denominator = sum(counts.values()) + len(counts) + 1
+        model[language] = {
+            "log_probs": {trigram: math.log((count + 1) / denominator) for trigram, count in counts.items()},
+            "unseen": math.log(1 / denominator)
+        }
+    return model
+
+# Score normalized text; returns (language, confidence) where confidence is 0.0 when there is no signal at all
+@lru_cache(maxsize=LANGUAGE_CACHE_SIZE)
+def score_language(normalized_text):
+    if not normalized_text:
+        return "en", 0.0
+
+    evidence = 0.0  # Positive values favour Spanish, negative values favour English
+    evidence += 2.0 * sum(1 for char in normalized_text if char in SPANISH_ONLY_CHARACTERS)
+    words = strip_accents(normalized_text).split()
+    keyword_hits = 0
+    for word in words:
+        if word in SPANISH_KEYWORDS:
+            evidence += 1.5
+            keyword_hits += 1
+        if word in ENGLISH_KEYWORDS:
+            evidence -= 1.5
+            keyword_hits += 1
+    # One or two words with no keyword and no Spanish-only letter ("no", "Sure", "ok") carry no real signal
+    if len(words) < 3 and not keyword_hits and not evidence:
+        return "en", 0.0
+
+    trigrams = extract_trigrams(normalized_text)
+    if trigrams:
+        spanish_model = LANGUAGE_MODEL["es"]
+        english_model = LANGUAGE_MODEL["en"]
+        log_ratio = sum(
+            spanish_model["log_probs"].get(trigram, spanish_model["unseen"]) -
+            english_model["log_probs"].get(trigram, english_model["unseen"])
+            for trigram in trigrams
+        )
+        # Average per trigram so long messages don't drown out the keyword evidence; one or two words give too
+        # few trigrams to outweigh a keyword ("yes" looks Spanish by its letters alone)
+        evidence += 3.0 * log_ratio / len(trigrams) * min(1.0, len(words) / 3)
+
+    language = "es" if evidence > 0 else "en"
+    confidence = math.tanh(abs(evidence) / 3.0)
+    return language, confidence
+
+def detect_language(message):
+    if LANGUAGE_MODEL is None:
+        warm_up_language_detection()
+    return score_language(normalize_language_text(message or ""))
+
+# The language a conversation should switch to, or None to stay put: a switch needs a few words, a confident
+# score and at least one keyword of the new language, so a bare "no" doesn't turn an English conversation Spanish
+def detect_language_switch(message, current_language):
+    words = strip_accents(normalize_language_text(message or "")).split()
+    if len(words) < LANGUAGE_SWITCH_MIN_WORDS:
+        return None
+    language, confidence = detect_language(message)
+    keywords = SPANISH_KEYWORDS if language == "es" else ENGLISH_KEYWORDS
+    if language == current_language or confidence < LANGUAGE_SWITCH_MIN_CONFIDENCE or not any(word in keywords for word in words):
+        return None
+    return language
+
+# Build the model and prime the cache with common openers before serving traffic
+def warm_up_language_detection():
+    global LANGUAGE_MODEL
+    start_time = datetime.datetime.now()
+    LANGUAGE_MODEL = build_language_model()
+    score_language.cache_clear()
+    for phrase in ["hi", "hello", "hola", "thank you", "gracias", "what is my balance", "cual es mi saldo"]:
+        score_language(normalize_language_text(phrase))
+    logger.info(f"Language detection model ready in {(datetime.datetime.now() - start_time).total_seconds() * 1000:.2f} ms")
+
+warm_up_language_detection()
+
+# Upstream request coalescing: how long callers wait on an identical in-flight call before giving up
+TRANSACTIONS_COALESCE_TIMEOUT_SECONDS = float(os.getenv("TRANSACTIONS_COALESCE_TIMEOUT_SECONDS", "30"))
+ROSTER_COALESCE_TIMEOUT_SECONDS = float(os.getenv("ROSTER_COALESCE_TIMEOUT_SECONDS", "180"))
+XAI_COALESCE_TIMEOUT_SECONDS = float(os.getenv("XAI_COALESCE_TIMEOUT_SECONDS", "75"))
+
+# Concurrent callers asking for the same key share one in-flight upstream call and its result
+class SingleFlight:
+    def __init__(self):
+        self.calls = {}  # Maps key to {"done": Event, "result": object, "error": Exception or None}
+        self.lock = threading.Lock()
+        self.upstream_calls = Counter()
+        self.calls_saved = Counter()
+        self.timeouts = Counter()
+
+    # Keys are tuples whose first item names the kind of call, e.g. ("transactions", tenant_id)
+    def do(self, key, fn, timeout=None):
+        with self.lock:
+            call = self.calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self.calls[key] = call
+                self.upstream_calls[key[0]] += 1
+            else:
+                self.calls_saved[key[0]] += 1
+
+        if is_leader:
+            try:
+                call["result"] = fn()
+                return call["result"]
+            except Exception as e:
+                call["error"] = e
+                raise
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call["done"].set()
+
+        logger.debug(f"Joined in-flight upstream call for {key}")
+        if not call["done"].wait(timeout):
+            with self.lock:
+                self.timeouts[key[0]] += 1
+            raise TimeoutError(f"Timed out after {timeout}s waiting for in-flight call {key}")
+        if call["error"] is not None:
+            raise call["error"]
+        return call["result"]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "upstream_calls": dict(self.upstream_calls),
+                "calls_saved": dict(self.calls_saved),
+                "timeouts": dict(self.timeouts),
+                "in_flight": len(self.calls)
+            }
+
+UPSTREAM_CALLS = SingleFlight()
+
+# Rent Manager session settings (tokens are refreshed shortly before they are assumed to expire)
+RENT_MANAGER_TOKEN_TTL_MINUTES = int(os.getenv("RENT_MANAGER_TOKEN_TTL_MINUTES", "60"))
+RENT_MANAGER_TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("RENT_MANAGER_TOKEN_REFRESH_MARGIN_SECONDS", "120"))
+# After a failed authentication, callers share that failure instead of retrying until the backoff passes (doubling per failure)
+RENT_MANAGER_AUTH_BACKOFF_SECONDS = float(os.getenv("RENT_MANAGER_AUTH_BACKOFF_SECONDS", "5"))
+RENT_MANAGER_AUTH_MAX_BACKOFF_SECONDS = float(os.getenv("RENT_MANAGER_AUTH_MAX_BACKOFF_SECONDS", "300"))
+RENT_MANAGER_REQUEST_ATTEMPTS = 2  # The first try plus one retry with a refreshed token after a 401
+RENT_MANAGER_CONNECT_TIMEOUT_SECONDS = float(os.getenv("RENT_MANAGER_CONNECT_TIMEOUT_SECONDS", "5"))
+RENT_MANAGER_READ_TIMEOUT_SECONDS = float(os.getenv("RENT_MANAGER_READ_TIMEOUT_SECONDS", "30"))  # Bounds how long a login holds the session lock
+RENT_MANAGER_TIMEOUT = (RENT_MANAGER_CONNECT_TIMEOUT_SECONDS, RENT_MANAGER_READ_TIMEOUT_SECONDS)
 
 # Global dictionaries for conversation state
-MAINTENANCE_REQUESTS = []
-CALL_LOGS = []
+CALL_LOGS = []  # Recent voice calls with per-turn latency metrics, persisted to CALL_LOGS_FILE
 PENDING_IDENTIFICATION = {}
 CURRENT_CONVERSATIONS = {}  # Maps phone_number to {"tenant_key": (tenant_id, first_name, last_name, unit), "last_message_time": datetime, "pending_end": bool, "pending_identification": bool, "language": str, "initial_language": str, "message_history": deque}
 
+# Webhook idempotency settings (Twilio retries a slow /sms webhook with the same MessageSid)
+MESSAGE_DEDUP_TTL_SECONDS = int(os.getenv("MESSAGE_DEDUP_TTL_SECONDS", "900"))
+MESSAGE_DEDUP_MAX_ENTRIES = int(os.getenv("MESSAGE_DEDUP_MAX_ENTRIES", "5000"))
+
+# Bounded, time-expiring record of webhook deliveries keyed on Twilio's MessageSid
+class MessageDedupStore:
+    def __init__(self, ttl_seconds, max_entries):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # Maps MessageSid to {"outcome": str or None while in flight, "expires_at": float}
+        self.lock = threading.Lock()
+        self.duplicates_suppressed = 0
+
+    def _evict(self, now):
+        # Entries are kept in insertion order, so expired ones are always at the front
+        while self.entries:
+            oldest_sid, oldest_entry = next(iter(self.entries.items()))
+            if oldest_entry["expires_at"] > now and len(self.entries) <= self.max_entries:
+                break
+            del self.entries[oldest_sid]
+
+    # Returns (True, None) for a first delivery, or (False, outcome) for a repeat; outcome is None while the original is still in flight
+    def claim(self, message_sid):
+        now = time.monotonic()
+        with self.lock:
+            self._evict(now)
+            entry = self.entries.get(message_sid)
+            if entry is not None:
+                self.duplicates_suppressed += 1
+                return False, entry["outcome"]
+            self.entries[message_sid] = {"outcome": None, "expires_at": now + self.ttl_seconds}
+            return True, None
+
+    def complete(self, message_sid, outcome):
+        with self.lock:
+            if message_sid in self.entries:
+                self.entries[message_sid]["outcome"] = outcome
+
+    # Forget a delivery that failed before producing an outcome so Twilio's retry is processed
+    def release(self, message_sid):
+        with self.lock:
+            self.entries.pop(message_sid, None)
+
+    def stats(self):
+        with self.lock:
+            return {"tracked_messages": len(self.entries), "duplicates_suppressed": self.duplicates_suppressed}
+
+MESSAGE_DEDUP = MessageDedupStore(MESSAGE_DEDUP_TTL_SECONDS, MESSAGE_DEDUP_MAX_ENTRIES)
+
+# Burst coalescing settings: texts from one phone arriving within the window are processed together (0 disables)
+SMS_BURST_WINDOW_SECONDS = float(os.getenv("SMS_BURST_WINDOW_SECONDS", "2.5"))
+SMS_BURST_MAX_DELAY_SECONDS = float(os.getenv("SMS_BURST_MAX_DELAY_SECONDS", "8"))
+SMS_BURST_OPENER_MAX_WORDS = int(os.getenv("SMS_BURST_OPENER_MAX_WORDS", "4"))
+
+# Greetings and filler that neither identify a tenant nor ask anything on their own
+FILLER_WORDS = {
+    "hi", "hello", "hey", "yo", "good", "morning", "afternoon", "evening", "there", "ok", "okay", "thanks", "thank", "you", "yes", "please",
+    "hola", "buenas", "buenos", "buen", "dia", "días", "dias", "tardes", "noches", "gracias", "si", "sí", "por", "favor", "oye"
+}
+
+def is_filler_message(message):
+    return all(word in FILLER_WORDS for word in re.findall(r"[\w']+", message.lower()))
+
+# A greeting or a short unpunctuated fragment ("this is maria", "lot 12") is probably the start of a burst;
+# anything else is answered without waiting for follow-up texts
+def looks_like_opener(message):
+    message = message.strip()
+    if is_filler_message(message):
+        return True
+    return len(message.split()) <= SMS_BURST_OPENER_MAX_WORDS and not message.endswith(("?", ".", "!"))
+
+# Per-phone debounce: the first request of a burst waits for follow-up texts and processes them all,
+# later requests hand their message over and return immediately. Needs a threaded worker to see the whole burst.
+# open_burst / add_to_burst / seconds_left / close_burst are the burst policy, also used by the async engine's mailboxes.
+class MessageBurstCoalescer:
+    def __init__(self, window_seconds, max_delay_seconds):
+        self.window_seconds = window_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.bursts = {}  # Maps phone_number to {"messages": [str], "first_at": float, "last_at": float, "complete": bool}
+        self.condition = threading.Condition()
+        self.bursts_processed = 0
+        self.messages_coalesced = 0
+
+    # Only an opener holds the window open; a complete message is processed right away
+    def open_burst(self, message):
+        now = time.monotonic()
+        return {"messages": [message], "first_at": now, "last_at": now, "complete": self.window_seconds <= 0 or not looks_like_opener(message)}
+
+    # A complete follow-up ends the burst instead of extending it
+    def add_to_burst(self, burst, message):
+        with self.condition:
+            burst["messages"].append(message)
+            burst["last_at"] = time.monotonic()
+            burst["complete"] = burst["complete"] or not looks_like_opener(message)
+            self.messages_coalesced += 1
+
+    # Each new text extends the window, but never past the max added latency
+    def seconds_left(self, burst):
+        if burst["complete"]:
+            return 0
+        return min(burst["last_at"] + self.window_seconds, burst["first_at"] + self.max_delay_seconds) - time.monotonic()
+
+    def close_burst(self, burst):
+        with self.condition:
+            self.bursts_processed += 1
+        return burst["messages"]
+
+    # Returns the burst's messages if this caller should process them, or None if they were handed to an open burst
+    def collect(self, phone_number, message):
+        with self.condition:
+            burst = self.bursts.get(phone_number)
+            if burst is not None:
+                self.add_to_burst(burst, message)
+                self.condition.notify_all()
+                return None
+            burst = self.open_burst(message)
+            if burst["complete"]:
+                return self.close_burst(burst)
+
+            self.bursts[phone_number] = burst
+            remaining = self.seconds_left(burst)
+            while remaining > 0:
+                self.condition.wait(remaining)
+                remaining = self.seconds_left(burst)
+            del self.bursts[phone_number]
+            return self.close_burst(burst)
+
+    def stats(self):
+        with self.condition:
+            return {
+                "bursts_processed": self.bursts_processed,
+                "messages_coalesced": self.messages_coalesced,
+                "open_bursts": len(self.bursts)
+            }
+
+MESSAGE_BURSTS = MessageBurstCoalescer(SMS_BURST_WINDOW_SECONDS, SMS_BURST_MAX_DELAY_SECONDS)
+
+# Conversation state locking for threaded workers (e.g. gunicorn --worker-class gthread):
+# CONVERSATIONS_LOCK guards the CURRENT_CONVERSATIONS / PENDING_IDENTIFICATION dicts and message_history deques,
+# SAVE_LOCK keeps snapshots and file writes in order, and PHONE_LOCKS serializes processing per phone number
+CONVERSATIONS_LOCK = threading.RLock()
+SAVE_LOCK = threading.Lock()
+
+# FIFO lock per phone number: one tenant's messages are handled in arrival order, different tenants run in parallel
+class PhoneLocks:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.queues = {}  # Maps phone_number to {"next_ticket": int, "serving": int}; removed when nobody holds or waits
+
+    @contextmanager
+    def hold(self, phone_number):
+        queue = self.acquire(phone_number)
+        try:
+            yield
+        finally:
+            self.release(phone_number, queue)
+
+    # Wait for this phone number's turn; pass the returned queue to release(), which may run on another thread
+    def acquire(self, phone_number):
+        with self.condition:
+            queue = self.queues.setdefault(phone_number, {"next_ticket": 0, "serving": 0})
+            ticket = queue["next_ticket"]
+            queue["next_ticket"] += 1
+            while queue["serving"] != ticket:
+                self.condition.wait()
+        return queue
+
+    # Like hold(), but yields False instead of waiting when the phone number is busy
+    @contextmanager
+    def try_hold(self, phone_number):
+        with self.condition:
+            acquired = phone_number not in self.queues
+            if acquired:
+                queue = {"next_ticket": 1, "serving": 0}
+                self.queues[phone_number] = queue
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.release(phone_number, queue)
+
+    def release(self, phone_number, queue):
+        with self.condition:
+            queue["serving"] += 1
+            if queue["serving"] == queue["next_ticket"]:
+                del self.queues[phone_number]
+            self.condition.notify_all()
+
+PHONE_LOCKS = PhoneLocks()
+
+# Admission control settings: messages wait for a processing slot by priority class, and the number of slots
+# adapts to observed xAI latency
+PRIORITY_CLASSES = ["emergency", "maintenance", "normal"]  # Highest priority first
+ADMISSION_MIN_CONCURRENCY = int(os.getenv("ADMISSION_MIN_CONCURRENCY", "2"))
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "32"))
+ADMISSION_INITIAL_CONCURRENCY = int(os.getenv("ADMISSION_INITIAL_CONCURRENCY", "8"))
+ADMISSION_XAI_LATENCY_TARGET_SECONDS = float(os.getenv("ADMISSION_XAI_LATENCY_TARGET_SECONDS", "6"))
+ADMISSION_QUEUE_LIMITS = {
+    "emergency": int(os.getenv("ADMISSION_QUEUE_LIMIT_EMERGENCY", "500")),
+    "maintenance": int(os.getenv("ADMISSION_QUEUE_LIMIT_MAINTENANCE", "100")),
+    "normal": int(os.getenv("ADMISSION_QUEUE_LIMIT_NORMAL", "50"))
+}
+# Deferred bursts wait in their own class's queue, outside its limit, so they're capped separately
+ADMISSION_DEFERRED_LIMIT = int(os.getenv("ADMISSION_QUEUE_LIMIT_DEFERRED", "500"))
+# How long a message may wait for a slot before it's deferred (Twilio gives up on the webhook after 15 seconds)
+ADMISSION_MAX_WAIT_SECONDS = {
+    "emergency": float(os.getenv("ADMISSION_MAX_WAIT_SECONDS_EMERGENCY", "10")),
+    "maintenance": float(os.getenv("ADMISSION_MAX_WAIT_SECONDS_MAINTENANCE", "6")),
+    "normal": float(os.getenv("ADMISSION_MAX_WAIT_SECONDS_NORMAL", "4"))
+}
+
+# Priority admission in front of message processing: bounded per-class queues, highest class served first,
+# and an AIMD concurrency limit that shrinks when xAI slows down and grows back when it recovers
+class AdmissionController:
+    def __init__(self, min_limit, max_limit, initial_limit, latency_target_seconds, queue_limits, deferred_limit):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max(min_limit, min(max_limit, initial_limit)))
+        self.latency_target_seconds = latency_target_seconds
+        self.queue_limits = queue_limits
+        self.deferred_limit = deferred_limit
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self.queues = {priority: deque() for priority in PRIORITY_CLASSES}  # Waiters: {"grant": callable, "priority": str, "deferred": bool, "enqueued_at": float, "granted": bool}
+        self.latency_ewma = None
+        self.last_decrease_at = 0.0
+        self.deferred_by_phone = {}  # Maps phone_number to a deque of deferred (messages, priority) bursts, drained in order
+        self.deferred_waiting = 0  # Deferred waiters in the class queues
+        self.counters = {priority: {"admitted": 0, "shed": 0, "deferred": 0} for priority in PRIORITY_CLASSES}
+        self.waits = {priority: deque(maxlen=1000) for priority in PRIORITY_CLASSES}  # Recent queue waits in seconds
+
+    def _has_capacity(self):
+        return self.in_use < int(self.limit)
+
+    # Call with self.lock held
+    def _grant(self, waiter):
+        waiter["granted"] = True
+        self.in_use += 1
+        self.counters[waiter["priority"]]["admitted"] += 1
+        self.waits[waiter["priority"]].append(time.monotonic() - waiter["enqueued_at"])
+
+    # Call with self.lock held; returns the waiters that were granted slots
+    def _dispatch(self):
+        granted = []
+        for priority in PRIORITY_CLASSES:
+            queue = self.queues[priority]
+            while queue and self._has_capacity():
+                waiter = queue.popleft()
+                if waiter["deferred"]:
+                    self.deferred_waiting -= 1
+                self._grant(waiter)
+                granted.append(waiter)
+        return granted
+
+    # Ask for a slot; grant() is called (possibly right away, on this thread) once one is available
+    # Returns the waiter, or None if the queue is full and the message should be shed. A deferred waiter keeps its
+    # class (a deferred emergency still goes ahead of live normal traffic) but counts against the deferred limit.
+    def submit(self, priority, grant, deferred=False):
+        waiter = {"grant": grant, "priority": priority, "deferred": deferred, "enqueued_at": time.monotonic(), "granted": False}
+        with self.lock:
+            higher_waiting = any(self.queues[queued] for queued in PRIORITY_CLASSES[:PRIORITY_CLASSES.index(priority) + 1])
+            if self._has_capacity() and not higher_waiting:
+                self._grant(waiter)
+            elif (self.deferred_waiting >= self.deferred_limit) if deferred else (len(self.queues[priority]) >= self.queue_limits[priority]):
+                self.counters[priority]["shed"] += 1
+                return None
+            else:
+                self.queues[priority].append(waiter)
+                if deferred:
+                    self.deferred_waiting += 1
+        if waiter["granted"]:
+            grant()
+        return waiter
+
+    # Withdraw a waiter that gave up; returns False if it was granted a slot in the meantime (release it instead)
+    def cancel(self, waiter):
+        with self.lock:
+            if waiter["granted"]:
+                return False
+            self.queues[waiter["priority"]].remove(waiter)
+            if waiter["deferred"]:
+                self.deferred_waiting -= 1
+            self.counters[waiter["priority"]]["shed"] += 1
+            self.waits[waiter["priority"]].append(time.monotonic() - waiter["enqueued_at"])
+            return True
+
+    # Blocking acquire for worker threads; timeout=None waits indefinitely. Returns True once admitted.
+    def acquire(self, priority, timeout=None, deferred=False):
+        granted = threading.Event()
+        waiter = self.submit(priority, granted.set, deferred=deferred)
+        if waiter is None:
+            return False
+        if granted.wait(timeout):
+            return True
+        return not self.cancel(waiter)
+
+    def release(self):
+        with self.lock:
+            self.in_use -= 1
+            granted = self._dispatch()
+        for waiter in granted:
+            waiter["grant"]()
+
+    # Feed an xAI call duration into the concurrency limit (additive increase, multiplicative decrease)
+    def observe_latency(self, seconds):
+        with self.lock:
+            self.latency_ewma = seconds if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * seconds
+            now = time.monotonic()
+            if self.latency_ewma > self.latency_target_seconds:
+                # Back off at most once per target interval so one slow stretch doesn't collapse the limit
+                if now - self.last_decrease_at >= self.latency_target_seconds:
+                    self.limit = max(self.min_limit, self.limit * 0.75)
+                    self.last_decrease_at = now
+                    logger.warning(f"xAI latency {self.latency_ewma:.1f}s is above target; admission limit lowered to {int(self.limit)}")
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            granted = self._dispatch()
+        for waiter in granted:
+            waiter["grant"]()
+
+    # Queue a deferred burst with its priority class; returns "first" if it's the phone's first (the caller starts a
+    # drain job), "queued", or None when the deferred queue is full. A tenant's later messages queue behind their
+    # deferred ones and stay in order
+    def defer(self, phone_number, messages, priority):
+        with self.lock:
+            if phone_number not in self.deferred_by_phone and len(self.deferred_by_phone) >= self.deferred_limit:
+                self.counters[priority]["shed"] += 1
+                return None
+            self.counters[priority]["deferred"] += 1
+            bursts = self.deferred_by_phone.setdefault(phone_number, deque())
+            bursts.append((messages, priority))
+            return "first" if len(bursts) == 1 else "queued"
+
+    # Count a burst the async engine is about to re-queue after it waited too long
+    def note_deferred(self, priority):
+        with self.lock:
+            self.counters[priority]["deferred"] += 1
+
+    # The phone's oldest deferred (messages, priority) burst (left queued until finish_deferred), or None once drained
+    def next_deferred(self, phone_number):
+        with self.lock:
+            bursts = self.deferred_by_phone.get(phone_number)
+            return bursts[0] if bursts else None
+
+    def finish_deferred(self, phone_number):
+        with self.lock:
+            bursts = self.deferred_by_phone.get(phone_number)
+            if bursts:
+                bursts.popleft()
+            if not bursts:
+                self.deferred_by_phone.pop(phone_number, None)
+
+    def has_deferred(self, phone_number):
+        with self.lock:
+            return phone_number in self.deferred_by_phone
+
+    def stats(self):
+        with self.lock:
+            classes = {}
+            for priority in PRIORITY_CLASSES:
+                waits = sorted(self.waits[priority])
+                classes[priority] = {
+                    "admitted": self.counters[priority]["admitted"],
+                    "shed": self.counters[priority]["shed"],
+                    "deferred": self.counters[priority]["deferred"],
+                    "queued": len(self.queues[priority]),
+                    "wait_ms_avg": round(1000 * sum(waits) / len(waits), 1) if waits else 0,
+                    "wait_ms_p95": round(1000 * waits[int(0.95 * (len(waits) - 1))], 1) if waits else 0,
+                    "wait_ms_max": round(1000 * waits[-1], 1) if waits else 0
+                }
+            return {
+                "limit": int(self.limit),
+                "in_use": self.in_use,
+                "xai_latency_ewma_seconds": round(self.latency_ewma, 2) if self.latency_ewma is not None else None,
+                "deferred_phones": len(self.deferred_by_phone),
+                "deferred_waiting": self.deferred_waiting,
+                "classes": classes
+            }
+
+ADMISSION = AdmissionController(ADMISSION_MIN_CONCURRENCY, ADMISSION_MAX_CONCURRENCY, ADMISSION_INITIAL_CONCURRENCY, ADMISSION_XAI_LATENCY_TARGET_SECONDS, ADMISSION_QUEUE_LIMITS, ADMISSION_DEFERRED_LIMIT)
+# Deferred bursts only take a worker once they're admitted, so one worker per admission slot never queues
+DEFERRED_MESSAGES = ThreadPoolExecutor(max_workers=ADMISSION_MAX_CONCURRENCY, thread_name_prefix="deferred-messages")
+
 # File path for storing CURRENT_CONVERSATIONS
 CONVERSATIONS_FILE = "current_conversations.json"
 
@@ -90,26 +697,43 @@ def load_conversations():
 # Save CURRENT_CONVERSATIONS to file
 def save_conversations():
     try:
-        # Convert datetime objects to strings for JSON serialization
-        data = {}
-        for phone_number, conversation in CURRENT_CONVERSATIONS.items():
-            data[phone_number] = {
-                "tenant_key": conversation["tenant_key"],
-                "last_message_time": conversation["last_message_time"].isoformat(),
-                "pending_end": conversation["pending_end"],
-                "pending_identification": conversation.get("pending_identification", False),
-                "language": conversation.get("language", "en"),
-                "initial_language": conversation.get("initial_language", "en"),
-                "message_history": list(conversation["message_history"])
-            }
-            if "pending_end_time" in conversation and conversation["pending_end_time"]:
-                data[phone_number]["pending_end_time"] = conversation["pending_end_time"].isoformat()
-        with open(CONVERSATIONS_FILE, "w") as f:
-            json.dump(data, f)
+        with SAVE_LOCK:
+            # Convert datetime objects to strings for JSON serialization
+            data = {}
+            with CONVERSATIONS_LOCK:
+                for phone_number, conversation in CURRENT_CONVERSATIONS.items():
+                    data[phone_number] = {
+                        "tenant_key": conversation["tenant_key"],
+                        "last_message_time": conversation["last_message_time"].isoformat(),
+                        "pending_end": conversation["pending_end"],
+                        "pending_identification": conversation.get("pending_identification", False),
+                        "language": conversation.get("language", "en"),
+                        "initial_language": conversation.get("initial_language", "en"),
+                        "message_history": list(conversation["message_history"])
+                    }
+                    if "pending_end_time" in conversation and conversation["pending_end_time"]:
+                        data[phone_number]["pending_end_time"] = conversation["pending_end_time"].isoformat()
+            # Write to a temporary file and swap it in so a crash never leaves a half-written file
+            temp_file = f"{CONVERSATIONS_FILE}.tmp"
+            with open(temp_file, "w") as f:
+                json.dump(data, f)
+            os.replace(temp_file, CONVERSATIONS_FILE)
         logger.info("Saved CURRENT_CONVERSATIONS to file")
     except Exception as e:
         logger.error(f"Error saving CURRENT_CONVERSATIONS to file: {str(e)}")
 
+# Append a message to a conversation's history
+def record_message(phone_number, role, content):
+    with CONVERSATIONS_LOCK:
+        CURRENT_CONVERSATIONS[phone_number]["message_history"].append({"role": role, "content": content})
+
+# Remove a conversation and everything tied to it
+def end_conversation(phone_number):
+    with CONVERSATIONS_LOCK:
+        CURRENT_CONVERSATIONS.pop(phone_number, None)
+        PENDING_IDENTIFICATION.pop(phone_number, None)
+    TRANSACTION_PREFETCH.cancel_for_phone(phone_number)
+
 # Load conversations at startup
 load_conversations()
 
@@ -123,9 +747,8 @@ def reset_conversations_on_startup():
 # Call the reset function when the app starts
 reset_conversations_on_startup()
 
-# Authenticate with Rent Manager API to obtain a token
+# Authenticate with Rent Manager API to obtain a token (use RENT_MANAGER_SESSION rather than calling this directly)
 def authenticate_with_rent_manager():
-    global RENT_MANAGER_API_TOKEN
     if not RENT_MANAGER_USERNAME or not RENT_MANAGER_PASSWORD:
         logger.error("Rent Manager credentials not found in environment variables.")
         return None
@@ -141,9 +764,8 @@ def authenticate_with_rent_manager():
 
     try:
         logger.info(f"Attempting to authenticate with Rent Manager at {RENT_MANAGER_AUTH_URL}")
-        response = requests.post(RENT_MANAGER_AUTH_URL, json=payload, headers=headers)
+        response = requests.post(RENT_MANAGER_AUTH_URL, json=payload, headers=headers, timeout=RENT_MANAGER_TIMEOUT)
         logger.info(f"Authentication Response Status: {response.status_code}")
-        logger.info(f"Authentication Response Text: {response.text}")
         response.raise_for_status()
 
         # The API returns the token as a raw string, not JSON
@@ -152,13 +774,210 @@ def authenticate_with_rent_manager():
             logger.error("Authentication failed: No token received from Rent Manager API.")
             return None
 
-        RENT_MANAGER_API_TOKEN = token
-        logger.info(f"Successfully authenticated with Rent Manager. Token: {RENT_MANAGER_API_TOKEN}")
-        return RENT_MANAGER_API_TOKEN
+        logger.info("Successfully authenticated with Rent Manager.")
+        return token
     except requests.exceptions.RequestException as e:
         logger.error(f"Error authenticating with Rent Manager: {str(e)}")
         return None
 
+# Raised when no Rent Manager token can be obtained; a RequestException so existing handlers catch it
+class RentManagerAuthError(requests.exceptions.RequestException):
+    pass
+
+# Shared Rent Manager session: one token for every call path, refreshed in a single flight
+class RentManagerSession:
+    def __init__(self, token_ttl_seconds, refresh_margin_seconds, backoff_seconds, max_backoff_seconds):
+        self.token_ttl_seconds = token_ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.token = None
+        self.expires_at = 0.0
+        self.retry_after = 0.0
+        self.consecutive_failures = 0
+        self.lock = threading.Lock()
+        self.auth_calls = 0
+        self.auth_failures = 0
+        self.auth_skipped = 0
+        self.unauthorized_responses = 0
+
+    def _needs_refresh(self):
+        return not self.token or time.monotonic() >= self.expires_at - self.refresh_margin_seconds
+
+    def get_token(self):
+        token = self.token
+        if token and not self._needs_refresh():
+            return token
+        return self.refresh(stale_token=token)
+
+    # Re-authenticate unless another caller already replaced stale_token while we waited for the lock.
+    # rejected=True means Rent Manager answered 401 for stale_token, so it is never handed out again.
+    def refresh(self, stale_token=None, rejected=False):
+        with self.lock:
+            if rejected and self.token == stale_token:
+                self.token = None
+            if self.token and self.token != stale_token and not self._needs_refresh():
+                return self.token
+            now = time.monotonic()
+            if now < self.retry_after:
+                # The last attempt failed: every caller shares that result until the backoff passes
+                self.auth_skipped += 1
+                return self.token if self.token and now < self.expires_at else None
+            self.auth_calls += 1
+            token = authenticate_with_rent_manager()
+            if token:
+                self.token = token
+                self.expires_at = time.monotonic() + self.token_ttl_seconds
+                self.consecutive_failures = 0
+                self.retry_after = 0.0
+            else:
+                self.auth_failures += 1
+                self.consecutive_failures += 1
+                backoff = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (self.consecutive_failures - 1))
+                self.retry_after = time.monotonic() + backoff
+                logger.warning(f"Rent Manager authentication failed; next attempt in {backoff:.0f}s")
+                # A proactive refresh that fails can still fall back to the current token until it expires
+                if time.monotonic() >= self.expires_at:
+                    self.token = None
+            return self.token
+
+    # Send a request with the session token, re-authenticating and retrying once on 401
+    def request(self, method, url, headers=None, **kwargs):
+        token = self.get_token()
+        if not token:
+            raise RentManagerAuthError("Failed to authenticate with Rent Manager.")
+        headers = dict(headers or {})
+        kwargs.setdefault("timeout", RENT_MANAGER_TIMEOUT)
+        for attempt in range(RENT_MANAGER_REQUEST_ATTEMPTS):
+            headers["X-RM12Api-ApiToken"] = token
+            response = requests.request(method, url, headers=headers, **kwargs)
+            if response.status_code != 401:
+                return response
+            token = self.token_after_unauthorized(url, token, attempt)
+            if not token:
+                break
+        return response
+
+    # After a 401 on the given attempt: returns a fresh token to retry with, or None when out of attempts
+    # (shared by request() and the async engine's fetches)
+    def token_after_unauthorized(self, url, token, attempt):
+        self.note_unauthorized()
+        if attempt + 1 >= RENT_MANAGER_REQUEST_ATTEMPTS:
+            return None
+        logger.warning(f"Received 401 Unauthorized from Rent Manager for {url}. Refreshing token and retrying...")
+        token = self.refresh(stale_token=token, rejected=True)
+        if not token:
+            raise RentManagerAuthError("Failed to re-authenticate with Rent Manager after 401 error.")
+        return token
+
+    def note_unauthorized(self):
+        with self.lock:
+            self.unauthorized_responses += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "auth_calls": self.auth_calls,
+                "auth_failures": self.auth_failures,
+                "auth_skipped": self.auth_skipped,
+                "auth_backoff_seconds": max(0, round(self.retry_after - time.monotonic(), 1)),
+                "unauthorized_responses": self.unauthorized_responses,
+                "token_valid_for_seconds": max(0, int(self.expires_at - time.monotonic())) if self.token else 0
+            }
+
+RENT_MANAGER_SESSION = RentManagerSession(RENT_MANAGER_TOKEN_TTL_MINUTES * 60, RENT_MANAGER_TOKEN_REFRESH_MARGIN_SECONDS, RENT_MANAGER_AUTH_BACKOFF_SECONDS, RENT_MANAGER_AUTH_MAX_BACKOFF_SECONDS)
+
+# Fields ParkBot actually reads from Rent Manager; requests ask for these instead of whole objects
+TENANT_FIELDS = [
+    "TenantID", "Name", "PropertyID", "RentDueDay", "PostingStartDate", "Balance",
+    "Leases.Unit.Name",
+    "Addresses.Street", "Addresses.City", "Addresses.State", "Addresses.PostalCode",
+    "Contacts.PhoneNumbers.PhoneNumber"
+]
+PROPERTY_FIELDS = [
+    "PropertyID", "Name", "BillingName1",
+    "Addresses.Street", "Addresses.City", "Addresses.State", "Addresses.PostalCode", "Addresses.IsPrimary"
+]
+TRANSACTION_FIELDS = [
+    "TenantID",
+    "Transactions.TransactionID", "Transactions.TransactionDate", "Transactions.TransactionType", "Transactions.Amount", "Transactions.Comment"
+]
+
+# Tracks Rent Manager payload sizes on the wire (compressed) and after decoding
+class TransferStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.kinds = {}  # Maps call kind to {"calls": int, "wire_bytes": int, "decoded_bytes": int}
+
+    # wire_bytes is None when the size on the wire isn't known (e.g. a chunked response)
+    def record(self, kind, wire_bytes, decoded_bytes):
+        if wire_bytes is None:
+            wire_bytes = decoded_bytes
+        saved = decoded_bytes - wire_bytes
+        logger.info(f"Rent Manager {kind} payload: {wire_bytes} bytes transferred, {decoded_bytes} bytes decoded ({saved} bytes saved, {100 * saved / decoded_bytes if decoded_bytes else 0:.0f}%)")
+        with self.lock:
+            totals = self.kinds.setdefault(kind, {"calls": 0, "wire_bytes": 0, "decoded_bytes": 0})
+            totals["calls"] += 1
+            totals["wire_bytes"] += wire_bytes
+            totals["decoded_bytes"] += decoded_bytes
+
+    def stats(self):
+        with self.lock:
+            return {kind: dict(totals) for kind, totals in self.kinds.items()}
+
+RENT_MANAGER_TRANSFERS = TransferStats()
+
+# Bytes a requests response took on the wire, before gzip decoding
+def wire_size(response):
+    try:
+        return response.raw.tell()
+    except Exception:
+        content_length = response.headers.get("Content-Length")
+        return int(content_length) if content_length and content_length.isdigit() else None
+
+# Headers for Rent Manager requests (the session adds the API token)
+def rent_manager_headers():
+    return {
+        "Content-Type": "application/json; charset=UTF-8",
+        "Accept": "application/json",
+        "Accept-Encoding": "gzip",
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    }
+
+# GET a Rent Manager collection, following Link header pagination; returns the combined list or None on failure
+def download_rent_manager_pages(kind, url, params, location_id):
+    results = []
+    headers = rent_manager_headers()
+    while url:
+        try:
+            logger.info(f"Fetching {kind} for LocationID={location_id} from {url}")
+            response = RENT_MANAGER_SESSION.request("GET", url, headers=headers, params=params)
+            logger.info(f"{kind.capitalize()} Fetch Response Status (LocationID={location_id}): {response.status_code}")
+            response.raise_for_status()
+            results.extend(response.json())
+            RENT_MANAGER_TRANSFERS.record(kind, wire_size(response), len(response.content))
+
+            # Check for the next page
+            link_header = response.headers.get("Link")
+            url = parse_link_header(link_header)
+            params = None  # Clear params for subsequent requests, as the URL already includes them
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error fetching {kind} for LocationID={location_id} from {url}: {str(e)}")
+            return None
+    return results
+
+# Fetch a location's properties once, keyed by PropertyID, instead of embedding the property in every tenant
+def download_properties(location_id):
+    params = {
+        "LocationID": location_id,
+        "fields": ",".join(PROPERTY_FIELDS),
+        "PageSize": 1000
+    }
+    properties = download_rent_manager_pages("properties", RENT_MANAGER_PROPERTIES_URL, params, location_id)
+    if properties is None:
+        return None
+    return {prop.get("PropertyID"): prop for prop in properties}
+
 # Parse the Link header to extract the next page URL
 def parse_link_header(link_header):
     if not link_header:
@@ -171,50 +990,43 @@ def parse_link_header(link_header):
                 return match.group(1)
     return None
 
-# Fetch tenant data from Rent Manager API with pagination, only fetching active tenants (Status="Current")
-def fetch_tenants_from_rent_manager():
-    global RENT_MANAGER_API_TOKEN
-    # Ensure we have a valid token
-    if not RENT_MANAGER_API_TOKEN:
-        authenticate_with_rent_manager()
-    
-    if not RENT_MANAGER_API_TOKEN:
-        logger.error("Failed to authenticate with Rent Manager. Cannot fetch tenants.")
-        return {}
+# Tenants outside the primary location get a "location:tenant" id, since TenantIDs are only unique within a location
+def qualify_tenant_id(location_id, tenant_id):
+    if str(location_id) == str(RENT_MANAGER_LOCATION_ID):
+        return tenant_id
+    return f"{location_id}:{tenant_id}"
+
+# Returns (location_id, Rent Manager TenantID) for a tenant_id from a tenant_key
+def split_tenant_id(tenant_id):
+    if isinstance(tenant_id, str) and ":" in tenant_id:
+        location_id, rent_manager_tenant_id = tenant_id.split(":", 1)
+        return location_id, rent_manager_tenant_id
+    return RENT_MANAGER_LOCATION_ID, tenant_id
+
+# Fetch one location's tenant data from Rent Manager API, sharing one download between simultaneous refreshes
+# Returns None if the roster couldn't be fetched so callers can keep their previous data
+def fetch_tenants_from_rent_manager(location_id=RENT_MANAGER_LOCATION_ID):
+    try:
+        return UPSTREAM_CALLS.do(("roster", location_id), lambda: download_tenants_from_rent_manager(location_id), timeout=ROSTER_COALESCE_TIMEOUT_SECONDS)
+    except TimeoutError as e:
+        logger.error(f"Error fetching tenants for LocationID={location_id}: {str(e)}")
+        return None
 
-    # Headers for the API request
-    headers = {
-        "X-RM12Api-ApiToken": RENT_MANAGER_API_TOKEN,
-        "Content-Type": "application/json; charset=UTF-8",
-        "Accept": "application/json",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+# Download tenant data from Rent Manager API with pagination, only fetching active tenants (Status="Current")
+def download_tenants_from_rent_manager(location_id=RENT_MANAGER_LOCATION_ID):
+    properties = download_properties(location_id)
+    if properties is None:
+        return None
 
-    # Parameters for the initial request without Transactions embed
+    # Parameters for the initial request without Transactions embed, projected to the fields we use
     params = {
-        "LocationID": RENT_MANAGER_LOCATION_ID,
+        "LocationID": location_id,
+        "fields": ",".join(TENANT_FIELDS),
         "PageSize": 1000  # Match the API's default page size
     }
-
-    all_tenants = []
-    url = RENT_MANAGER_BASE_URL
-
-    while url:
-        try:
-            logger.info(f"Fetching tenants from {url}")
-            response = requests.get(url, headers=headers, params=params)
-            logger.info(f"Tenant Fetch Response Status: {response.status_code}")
-            response.raise_for_status()
-            tenants_data = response.json()
-            all_tenants.extend(tenants_data)
-
-            # Check for the next page
-            link_header = response.headers.get("Link")
-            url = parse_link_header(link_header)
-            params = None  # Clear params for subsequent requests, as the URL already includes them
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching tenants from {url}: {str(e)}")
-            return {}
+    all_tenants = download_rent_manager_pages("tenants", RENT_MANAGER_BASE_URL, params, location_id)
+    if all_tenants is None:
+        return None
 
     # Process the tenants into the required format (all tenants are current due to API filter)
     tenants = {}
@@ -254,8 +1066,16 @@ def fetch_tenants_from_rent_manager():
                 "postal_code": addresses[0].get("PostalCode", "Unknown") if addresses else "Unknown"
             }
 
-            # Extract park information from the Property object
-            property_info = tenant.get("Property", {})
+            # Collect the tenant's contact phone numbers so known numbers can skip identification
+            phone_numbers = []
+            for contact in tenant.get("Contacts", []) or []:
+                for phone in contact.get("PhoneNumbers", []) or []:
+                    phone_number = normalize_phone_number(phone.get("PhoneNumber"))
+                    if phone_number and phone_number not in phone_numbers:
+                        phone_numbers.append(phone_number)
+
+            # Extract park information from the tenant's Property
+            property_info = properties.get(tenant.get("PropertyID"), {})
             park_addresses = property_info.get("Addresses", [])
             primary_address = next((addr for addr in park_addresses if addr.get("IsPrimary", False)), {
                 "street": "Unknown",
@@ -277,14 +1097,16 @@ def fetch_tenants_from_rent_manager():
             }
 
             # Use TenantID as part of the key to avoid duplicates, normalize unit name
-            tenant_key = (tenant_id, first_name, last_name, lot.lower().replace(" ", ""))
+            tenant_key = (qualify_tenant_id(location_id, tenant_id), first_name, last_name, lot.lower().replace(" ", ""))
             tenants[tenant_key] = {
                 "tenant_id": tenant_id,  # Add tenant_id for logging purposes
+                "location_id": location_id,
                 "balance": balance,
                 "due_date": due_date,
                 "move_in_date": move_in_date,
                 "address": address_details,
                 "park": park,
+                "phone_numbers": phone_numbers,
                 "transactions": None,  # Transactions will be fetched on-demand
                 "last_payment_date": None  # Will be set when transactions are fetched
             }
@@ -292,84 +1114,455 @@ def fetch_tenants_from_rent_manager():
             logger.error(f"Error processing tenant TenantID={tenant_id}: {str(e)}")
             continue
 
-    logger.info(f"Successfully fetched {len(tenants)} current tenants from Rent Manager (total tenants fetched: {len(all_tenants)})")
+    logger.info(f"Successfully fetched {len(tenants)} current tenants from Rent Manager LocationID={location_id} (total tenants fetched: {len(all_tenants)})")
     return tenants
 
-# Fetch transaction data for a specific tenant on-demand
+# Fetch transaction data for a specific tenant on-demand, sharing one download between concurrent requests
 def fetch_tenant_transactions(tenant_id):
-    global RENT_MANAGER_API_TOKEN
-    if not RENT_MANAGER_API_TOKEN:
-        authenticate_with_rent_manager()
-    
-    if not RENT_MANAGER_API_TOKEN:
-        logger.error("Failed to authenticate with Rent Manager. Cannot fetch transactions.")
+    try:
+        transactions, last_payment_date = UPSTREAM_CALLS.do(
+            ("transactions", tenant_id),
+            lambda: download_tenant_transactions(tenant_id),
+            timeout=TRANSACTIONS_COALESCE_TIMEOUT_SECONDS
+        )
+    except TimeoutError as e:
+        logger.error(f"Error fetching transactions for TenantID={tenant_id}: {str(e)}")
         return None, None
+    # Each caller gets its own list since responses sort transactions in place
+    return (list(transactions) if transactions is not None else None), last_payment_date
 
-    # Headers for the API request
-    headers = {
-        "X-RM12Api-ApiToken": RENT_MANAGER_API_TOKEN,
-        "Content-Type": "application/json; charset=UTF-8",
-        "Accept": "application/json",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+# Download a tenant's transactions from Rent Manager
+def download_tenant_transactions(tenant_id):
+    url, headers, params = tenant_transactions_request(tenant_id)
+    try:
+        logger.info(f"Fetching transactions for TenantID={tenant_id} from {url}")
+        response = RENT_MANAGER_SESSION.request("GET", url, headers=headers, params=params)
+        logger.info(f"Transaction Fetch Response Status (TenantID={tenant_id}): {response.status_code}")
+        logger.info(f"Transaction Fetch Response Text (TenantID={tenant_id}): {response.text[:500]}...")  # Truncate for brevity
+        response.raise_for_status()
+        RENT_MANAGER_TRANSFERS.record("transactions", wire_size(response), len(response.content))
+        transactions, last_payment_date = summarize_transactions(response.json())
+        logger.info(f"Fetched {len(transactions)} transactions for TenantID={tenant_id}")
+        return transactions, last_payment_date
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error fetching transactions for TenantID={tenant_id}: {str(e)}")
+        return None, None
 
-    # Parameters for the API request
+# URL, headers and params for fetching a tenant's transactions (the session adds the API token)
+def tenant_transactions_request(tenant_id):
+    headers = rent_manager_headers()
+    location_id, rent_manager_tenant_id = split_tenant_id(tenant_id)
     params = {
-        "LocationID": RENT_MANAGER_LOCATION_ID
+        "LocationID": location_id,
+        "fields": ",".join(TRANSACTION_FIELDS)
     }
-
     # Construct the URL for the specific tenant with Transactions embed
-    url = f"https://shadynook.api.rentmanager.com/Tenants/{tenant_id}?embeds=Transactions"
+    url = f"https://shadynook.api.rentmanager.com/Tenants/{rent_manager_tenant_id}?embeds=Transactions"
+    return url, headers, params
+
+# Sort a tenant's transactions by date and find their most recent payment
+def summarize_transactions(tenant_data):
+    # Extract all transactions (no limit)
+    transactions = tenant_data.get("Transactions", [])
+    # Sort transactions by TransactionDate in ascending order for statement generation
+    transactions.sort(key=lambda x: x.get("TransactionDate", ""))
+    # Find the most recent payment
+    payment_transactions = [t for t in transactions if t.get("TransactionType") == "Payment"]
+    last_payment_date = "Unknown"
+    if payment_transactions:
+        # Sort in descending order to get the most recent payment
+        payment_transactions.sort(key=lambda x: x.get("TransactionDate", ""), reverse=True)
+        last_payment_date = payment_transactions[0].get("TransactionDate", "Unknown")
+    return transactions, last_payment_date
+
+# Infer the monthly rent charge from the newest non-payment transaction whose comment mentions rent (the current
+# rent after a change), whatever order the transactions come in. Every reply and summary path uses this.
+def infer_monthly_rent_charge(transactions):
+    for transaction in sorted(transactions, key=lambda transaction: transaction.get("TransactionDate", ""), reverse=True):
+        if "rent" in transaction.get("Comment", "").lower() and transaction.get("TransactionType") != "Payment":
+            return float(transaction.get("Amount", 0.00))
+    return None
 
-    for attempt in range(2):  # Try twice: once with the current token, and once after re-authenticating if needed
-        try:
-            logger.info(f"Fetching transactions for TenantID={tenant_id} from {url}")
-            response = requests.get(url, headers=headers, params=params)
-            logger.info(f"Transaction Fetch Response Status (TenantID={tenant_id}): {response.status_code}")
-            logger.info(f"Transaction Fetch Response Text (TenantID={tenant_id}): {response.text[:500]}...")  # Truncate for brevity
-            response.raise_for_status()
-            tenant_data = response.json()
-
-            # Extract all transactions (no limit)
-            transactions = tenant_data.get("Transactions", [])
-            # Sort transactions by TransactionDate in ascending order for statement generation
-            transactions.sort(key=lambda x: x.get("TransactionDate", ""))
-            # Find the most recent payment
-            payment_transactions = [t for t in transactions if t.get("TransactionType") == "Payment"]
-            last_payment_date = "Unknown"
-            if payment_transactions:
-                # Sort in descending order to get the most recent payment
-                payment_transactions.sort(key=lambda x: x.get("TransactionDate", ""), reverse=True)
-                last_payment_date = payment_transactions[0].get("TransactionDate", "Unknown")
-
-            logger.info(f"Fetched {len(transactions)} transactions for TenantID={tenant_id}")
-            return transactions, last_payment_date
+# A tenant's transactions along with the values derived from them
+def tenant_financials(transactions, last_payment_date):
+    return {
+        "transactions": transactions,
+        "last_payment_date": last_payment_date,
+        "monthly_rent_charge": infer_monthly_rent_charge(transactions) if transactions is not None else None
+    }
 
-        except requests.exceptions.HTTPError as e:
-            if response.status_code == 401:  # Unauthorized, token might be invalid
-                logger.warning(f"Received 401 Unauthorized error: {str(e)}. Attempting to re-authenticate...")
-                # Clear the current token and re-authenticate
-                RENT_MANAGER_API_TOKEN = None
-                authenticate_with_rent_manager()
-                if not RENT_MANAGER_API_TOKEN:
-                    logger.error("Failed to re-authenticate with Rent Manager after 401 error.")
-                    return None, None
-                # Update headers with the new token
-                headers["X-RM12Api-ApiToken"] = RENT_MANAGER_API_TOKEN
-                continue  # Retry the request with the new token
-            else:
-                logger.error(f"Error fetching transactions for TenantID={tenant_id}: {str(e)}")
-                return None, None
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching transactions for TenantID={tenant_id}: {str(e)}")
-            return None, None
+def load_tenant_financials(tenant_id):
+    return tenant_financials(*fetch_tenant_transactions(tenant_id))
+
+# Speculative prefetch settings: transactions are fetched as soon as a tenant is identified
+TRANSACTION_PREFETCH_MAX_WORKERS = int(os.getenv("TRANSACTION_PREFETCH_MAX_WORKERS", "4"))
+TRANSACTION_CACHE_TTL_SECONDS = int(os.getenv("TRANSACTION_CACHE_TTL_SECONDS", "600"))
+
+# Each caller gets its own transaction list, so sorting or trimming it can't change anyone else's copy
+def copy_financials(financials):
+    return dict(financials, transactions=list(financials["transactions"]) if financials["transactions"] is not None else None)
+
+# Starts background transaction fetches for identified tenants and serves them to the first financial question.
+# Both pipelines share it: the async engine passes submit= to run the fetch on its event loop instead of the pool.
+class TransactionPrefetcher:
+    def __init__(self, max_workers, ttl_seconds):
+        self.max_workers = max_workers
+        self.ttl_seconds = ttl_seconds
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="transaction-prefetch")
+        self.entries = {}  # Maps tenant_id to {"future": Future, "phone_number": str, "started_at": float, "used": bool}
+        self.lock = threading.Lock()
+        self.started = 0
+        self.skipped = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted = 0
+        self.cancelled = 0
+
+    def _is_fresh(self, entry):
+        return time.monotonic() - entry["started_at"] < self.ttl_seconds
+
+    def _discard(self, tenant_id, entry):
+        del self.entries[tenant_id]
+        if entry["used"]:
+            return
+        if entry["future"].cancel():
+            self.cancelled += 1
+        else:
+            self.wasted += 1
+
+    # submit() must return a concurrent.futures.Future resolving to the tenant's financials
+    def start(self, tenant_id, phone_number, submit=None):
+        with self.lock:
+            entry = self.entries.get(tenant_id)
+            if entry and self._is_fresh(entry):
+                entry["phone_number"] = phone_number
+                return
+            if entry:
+                self._discard(tenant_id, entry)
+            # Cap queued work so a burst of identifications can't pile up behind the worker pool
+            in_flight = sum(1 for queued in self.entries.values() if not queued["future"].done())
+            if in_flight >= self.max_workers * 2:
+                self.skipped += 1
+                logger.info(f"Skipped transaction prefetch for TenantID={tenant_id}: {in_flight} prefetches already in flight")
+                return
+            self.entries[tenant_id] = {
+                "future": submit() if submit else self.executor.submit(load_tenant_financials, tenant_id),
+                "phone_number": phone_number,
+                "started_at": time.monotonic(),
+                "used": False
+            }
+            self.started += 1
+        logger.info(f"Started transaction prefetch for TenantID={tenant_id}")
+
+    # Claim the tenant's prefetch: returns its Future, or None when the caller should fetch now.
+    # A prefetch is served once, so later questions (e.g. after a payment) see current data; fresh=True skips it.
+    def take(self, tenant_id, fresh=False):
+        with self.lock:
+            entry = self.entries.get(tenant_id)
+            if entry and (fresh or not self._is_fresh(entry)):
+                self._discard(tenant_id, entry)
+                entry = None
+            if not entry:
+                self.misses += 1
+                return None
+            del self.entries[tenant_id]
+            entry["used"] = True
+            self.hits += 1
+        logger.info(f"Serving transactions for TenantID={tenant_id} from prefetch")
+        return entry["future"]
+
+    # Returns the tenant's financials, from the prefetch when one is available and otherwise fetched now
+    def get(self, tenant_id, fresh=False):
+        future = self.take(tenant_id, fresh)
+        if future is None:
+            return load_tenant_financials(tenant_id)
+        return copy_financials(future.result())
+
+    # Drop prefetches started for a conversation that has ended
+    def cancel_for_phone(self, phone_number):
+        with self.lock:
+            for tenant_id, entry in list(self.entries.items()):
+                if entry["phone_number"] == phone_number:
+                    self._discard(tenant_id, entry)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "started": self.started,
+                "skipped": self.skipped,
+                "hits": self.hits,
+                "misses": self.misses,
+                "wasted": self.wasted,
+                "cancelled": self.cancelled,
+                "cached_tenants": len(self.entries)
+            }
+
+TRANSACTION_PREFETCH = TransactionPrefetcher(TRANSACTION_PREFETCH_MAX_WORKERS, TRANSACTION_CACHE_TTL_SECONDS)
+
+# Normalize a phone number to E.164 (US numbers without a country code get +1)
+def normalize_phone_number(phone_number):
+    if not phone_number:
+        return None
+    digits = re.sub(r"\D", "", str(phone_number))
+    if len(digits) == 10:
+        return f"+1{digits}"
+    if len(digits) == 11 and digits.startswith("1"):
+        return f"+{digits}"
+    if str(phone_number).strip().startswith("+") and len(digits) > 10:
+        return f"+{digits}"
+    return None
+
+# Persistent phone number -> tenant binding so returning tenants skip identification
+PHONE_BINDINGS_FILE = "phone_bindings.json"
+# Bindings from a name/unit match (or a voice transcription) aren't verified, so they expire; roster numbers don't
+PHONE_BINDING_IDENTIFIED_TTL_DAYS = int(os.getenv("PHONE_BINDING_IDENTIFIED_TTL_DAYS", "30"))
+PHONE_BINDINGS = {}  # Maps phone_number to {"tenant_id": str, "source": "identified", "rent_manager" or "rejected", "bound_at": iso datetime, "rejected": [tenant_id]}
+PHONE_BINDINGS_LOCK = threading.RLock()
+TENANT_KEYS_BY_ID = {}  # Index of TENANTS keys by tenant_id, rebuilt whenever TENANTS is refreshed
+
+def load_phone_bindings():
+    global PHONE_BINDINGS
+    try:
+        if os.path.exists(PHONE_BINDINGS_FILE):
+            with open(PHONE_BINDINGS_FILE, "r") as f:
+                PHONE_BINDINGS = json.load(f)
+            logger.info(f"Loaded {len(PHONE_BINDINGS)} phone bindings from file")
+        else:
+            PHONE_BINDINGS = {}
+    except Exception as e:
+        logger.error(f"Error loading phone bindings from file: {str(e)}")
+        PHONE_BINDINGS = {}
+
+def save_phone_bindings():
+    try:
+        with PHONE_BINDINGS_LOCK:
+            temp_file = f"{PHONE_BINDINGS_FILE}.tmp"
+            with open(temp_file, "w") as f:
+                json.dump(PHONE_BINDINGS, f)
+            os.replace(temp_file, PHONE_BINDINGS_FILE)
+        logger.info("Saved phone bindings to file")
+    except Exception as e:
+        logger.error(f"Error saving phone bindings to file: {str(e)}")
+
+def is_binding_expired(binding):
+    if binding["source"] != "identified":
+        return False
+    bound_at = datetime.datetime.fromisoformat(binding["bound_at"])
+    return datetime.datetime.now() - bound_at > datetime.timedelta(days=PHONE_BINDING_IDENTIFIED_TTL_DAYS)
+
+def bind_phone_to_tenant(phone_number, tenant_id, source):
+    phone_number = normalize_phone_number(phone_number) or phone_number
+    with PHONE_BINDINGS_LOCK:
+        existing = PHONE_BINDINGS.get(phone_number)
+        if existing and existing["tenant_id"] == tenant_id and existing["source"] == source:
+            return
+        # The roster's own phone numbers take precedence over a name or unit match
+        if existing and existing["source"] == "rent_manager" and source == "identified":
+            logger.info(f"Kept roster binding for {phone_number} (TenantID={existing['tenant_id']}) over identified TenantID={tenant_id}")
+            return
+        PHONE_BINDINGS[phone_number] = {
+            "tenant_id": tenant_id,
+            "source": source,
+            "bound_at": datetime.datetime.now().isoformat(),
+            "rejected": [rejected for rejected in (existing or {}).get("rejected", []) if rejected != tenant_id]
+        }
+    logger.info(f"Bound {phone_number} to TenantID={tenant_id} ({source})")
+    save_phone_bindings()
+
+# The tenant said the number was matched to the wrong person: forget the binding and don't bind that tenant again
+def reject_phone_binding(phone_number):
+    phone_number = normalize_phone_number(phone_number) or phone_number
+    with PHONE_BINDINGS_LOCK:
+        existing = PHONE_BINDINGS.get(phone_number)
+        if not existing or existing["source"] == "rejected":
+            return
+        PHONE_BINDINGS[phone_number] = {
+            "tenant_id": existing["tenant_id"],
+            "source": "rejected",
+            "bound_at": datetime.datetime.now().isoformat(),
+            "rejected": sorted(set(existing.get("rejected", [])) | {existing["tenant_id"]})
+        }
+    logger.info(f"Removed binding of {phone_number} to TenantID={existing['tenant_id']} at the tenant's request")
+    save_phone_bindings()
 
-    logger.error("Failed to fetch transactions after re-authentication attempt.")
-    return None, None
+# Returns the current tenant_key bound to a phone number, or None if unknown
+def lookup_bound_tenant(phone_number):
+    binding = PHONE_BINDINGS.get(normalize_phone_number(phone_number) or phone_number)
+    if not binding or binding["source"] == "rejected" or is_binding_expired(binding):
+        return None
+    return TENANT_KEYS_BY_ID.get(binding["tenant_id"])
+
+# Rebuild the tenant_id index, drop bindings for tenants no longer on the roster and add roster phone numbers
+def sync_phone_bindings_with_roster():
+    global TENANT_KEYS_BY_ID
+    TENANT_KEYS_BY_ID = {tenant_key[0]: tenant_key for tenant_key in TENANTS}
+    if not TENANTS:
+        logger.warning("Tenant roster is empty; keeping existing phone bindings")
+        return
+
+    # Bindings for a location whose roster hasn't loaded yet are kept until it does
+    loaded_locations = {location_id for location_id, roster in LOCATION_ROSTERS.items() if roster["refreshed_at"]}
+    with PHONE_BINDINGS_LOCK:
+        removed = [
+            phone for phone, binding in PHONE_BINDINGS.items()
+            if binding["tenant_id"] not in TENANT_KEYS_BY_ID and str(split_tenant_id(binding["tenant_id"])[0]) in loaded_locations
+        ]
+        expired = [phone for phone, binding in PHONE_BINDINGS.items() if phone not in removed and is_binding_expired(binding)]
+        for phone_number in removed + expired:
+            del PHONE_BINDINGS[phone_number]
+
+        # A number listed for several tenants (e.g. a shared household phone) is ambiguous, so it isn't bound from the roster
+        roster_phones = {}
+        for tenant_key, tenant_data in TENANTS.items():
+            for phone_number in tenant_data.get("phone_numbers", []):
+                roster_phones.setdefault(phone_number, set()).add(tenant_key[0])
+        added = 0
+        for phone_number, tenant_ids in roster_phones.items():
+            existing = PHONE_BINDINGS.get(phone_number)
+            if len(tenant_ids) != 1:
+                continue
+            tenant_id = next(iter(tenant_ids))
+            # Roster numbers replace identified bindings, unless the tenant told us this number isn't theirs
+            if tenant_id in (existing or {}).get("rejected", []):
+                continue
+            if not existing or existing["tenant_id"] != tenant_id or existing["source"] != "rent_manager":
+                PHONE_BINDINGS[phone_number] = {
+                    "tenant_id": tenant_id,
+                    "source": "rent_manager",
+                    "bound_at": datetime.datetime.now().isoformat(),
+                    "rejected": (existing or {}).get("rejected", [])
+                }
+                added += 1
+
+    logger.info(f"Phone bindings synced with roster: {len(PHONE_BINDINGS)} total, {added} added, {len(removed)} removed for departed tenants, {len(expired)} expired")
+    save_phone_bindings()
+
+load_phone_bindings()
+
+# Roster settings: every location is fetched concurrently and merged into TENANTS as soon as it arrives
+ROSTER_REFRESH_MAX_WORKERS = int(os.getenv("ROSTER_REFRESH_MAX_WORKERS", "4"))
+# Optional "number=Park Name" pairs, comma-separated, so texts to a park's own number only search that park
+PARK_MESSAGING_NUMBERS = os.getenv("PARK_MESSAGING_NUMBERS", "")
+
+TENANTS = {}  # Merged view of every location's roster
+LOCATION_ROSTERS = {location_id: {"tenants": {}, "refreshed_at": None, "last_error": None} for location_id in RENT_MANAGER_LOCATION_IDS}
+ROSTER_LOCK = threading.Lock()
+TENANT_PARTITIONS = {}  # Maps park name (lowercase) to {"location_id": str, "tenant_keys": [tenant_key]}, rebuilt with TENANTS
+TENANT_KEYS_BY_CITY = {}  # Maps tenant address city (lowercase) to [tenant_key], rebuilt with TENANTS
+PARK_HINT_TTL_SECONDS = int(os.getenv("PARK_HINT_TTL_SECONDS", "86400"))
+PARK_HINT_MAX_ENTRIES = int(os.getenv("PARK_HINT_MAX_ENTRIES", "5000"))
+
+# Bounded, time-expiring map of a sender's phone_number to the park whose messaging number they last texted
+class ParkHints:
+    def __init__(self, ttl_seconds, max_entries):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # Maps phone_number to {"park": str, "expires_at": float}, oldest first
+        self.lock = threading.Lock()
+
+    def _evict(self, now):
+        while self.entries:
+            oldest_phone, oldest_entry = next(iter(self.entries.items()))
+            if oldest_entry["expires_at"] > now and len(self.entries) <= self.max_entries:
+                break
+            del self.entries[oldest_phone]
+
+    def note(self, phone_number, park_name):
+        now = time.monotonic()
+        with self.lock:
+            self.entries.pop(phone_number, None)
+            self.entries[phone_number] = {"park": park_name, "expires_at": now + self.ttl_seconds}
+            self._evict(now)
+
+    def get(self, phone_number):
+        with self.lock:
+            entry = self.entries.get(phone_number)
+            return entry["park"] if entry and entry["expires_at"] > time.monotonic() else None
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+PARK_HINTS = ParkHints(PARK_HINT_TTL_SECONDS, PARK_HINT_MAX_ENTRIES)
+
+def parse_park_messaging_numbers(value):
+    parks = {}
+    for pair in value.split(","):
+        if "=" not in pair:
+            continue
+        number, park_name = pair.split("=", 1)
+        number = normalize_phone_number(number)
+        if number and park_name.strip():
+            parks[number] = " ".join(park_name.split()).lower()
+    return parks
+
+PARKS_BY_MESSAGING_NUMBER = parse_park_messaging_numbers(PARK_MESSAGING_NUMBERS)
+
+# Remember which park's number a tenant texted so identification can search that park first
+def note_messaging_number(from_number, to_number):
+    park_name = PARKS_BY_MESSAGING_NUMBER.get(normalize_phone_number(to_number))
+    if park_name:
+        PARK_HINTS.note(from_number, park_name)
+
+# Merge the location rosters into TENANTS and rebuild the park and city partitions (call with ROSTER_LOCK held)
+def rebuild_tenant_view():
+    global TENANTS, TENANT_PARTITIONS, TENANT_KEYS_BY_CITY
+    tenants = {}
+    partitions = {}
+    keys_by_city = {}
+    for location_id, roster in LOCATION_ROSTERS.items():
+        tenants.update(roster["tenants"])
+        for tenant_key, tenant_data in roster["tenants"].items():
+            park_name = " ".join(tenant_data["park"]["name"].split()).lower()
+            partitions.setdefault(park_name, {"location_id": location_id, "tenant_keys": []})["tenant_keys"].append(tenant_key)
+            city = tenant_data["address"]["city"].lower()
+            if city:
+                keys_by_city.setdefault(city, []).append(tenant_key)
+    TENANTS = tenants
+    TENANT_PARTITIONS = partitions
+    TENANT_KEYS_BY_CITY = keys_by_city
+    sync_phone_bindings_with_roster()
+    logger.info(f"Tenant roster rebuilt: {len(TENANTS)} tenants across {len(TENANT_PARTITIONS)} parks in {len(LOCATION_ROSTERS)} locations")
+
+# Refresh one location and merge it in right away; on failure the location keeps its previous roster
+def refresh_location_roster(location_id):
+    tenants = fetch_tenants_from_rent_manager(location_id)
+    with ROSTER_LOCK:
+        roster = LOCATION_ROSTERS.setdefault(location_id, {"tenants": {}, "refreshed_at": None, "last_error": None})
+        if tenants is None:
+            roster["last_error"] = datetime.datetime.now().isoformat()
+            logger.error(f"Tenant refresh failed for LocationID={location_id}; keeping its previous tenant data")
+            return False
+        roster["tenants"] = tenants
+        roster["refreshed_at"] = datetime.datetime.now().isoformat()
+        roster["last_error"] = None
+        rebuild_tenant_view()
+    return True
+
+# Refresh several locations concurrently so a slow location doesn't hold up the others
+# Returns {location_id: True if refreshed}
+def refresh_location_rosters(location_ids):
+    if not location_ids:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(len(location_ids), ROSTER_REFRESH_MAX_WORKERS), thread_name_prefix="roster-refresh") as executor:
+        return dict(zip(location_ids, executor.map(refresh_location_roster, location_ids)))
+
+def roster_stats():
+    with ROSTER_LOCK:
+        return {
+            location_id: {
+                "tenants": len(roster["tenants"]),
+                "refreshed_at": roster["refreshed_at"],
+                "last_error": roster["last_error"]
+            }
+            for location_id, roster in LOCATION_ROSTERS.items()
+        }
 
 # Initialize tenant data synchronously at startup
-logger.info("Fetching tenant data at startup...")
-TENANTS = fetch_tenants_from_rent_manager()
+logger.info(f"Fetching tenant data at startup for locations {', '.join(RENT_MANAGER_LOCATION_IDS)}...")
+if not any(refresh_location_rosters(RENT_MANAGER_LOCATION_IDS).values()):
+    with ROSTER_LOCK:
+        rebuild_tenant_view()
 logger.info("Tenant data fetch completed.")
 
 # Rent Rule
@@ -377,7 +1570,201 @@ RENT_DUE_DAY = 1  # Due on the 1st of each month
 LATE_FEE_PER_DAY = 5  # $5 per day after the 5th
 LATE_FEE_START_DAY = 5  # Late fees start after the 5th
 
-def identify_tenant(input_text):
+# Financial summary settings: a batch job precomputes each tenant's figures so replies and owner reports don't refetch transactions
+FINANCIAL_SUMMARIES_FILE = "financial_summaries.json"
+FINANCIAL_SUMMARY_MAX_WORKERS = int(os.getenv("FINANCIAL_SUMMARY_MAX_WORKERS", "4"))
+FINANCIAL_SUMMARY_MAX_AGE_HOURS = int(os.getenv("FINANCIAL_SUMMARY_MAX_AGE_HOURS", "24"))
+# How often the batch runs as a background job, starting with the first request (0 leaves it to /refresh_financial_summaries)
+FINANCIAL_SUMMARY_REFRESH_INTERVAL_MINUTES = int(os.getenv("FINANCIAL_SUMMARY_REFRESH_INTERVAL_MINUTES", "60"))
+
+def parse_money(value):
+    try:
+        return float(str(value).replace("$", "").replace(",", ""))
+    except ValueError:
+        return 0.0
+
+# Days late and accrued late fee as of today: rent is late after LATE_FEE_START_DAY while a balance is owed
+# and this month's payments haven't covered the rent
+def late_status(balance, monthly_rent_charge, month_to_date_payments, today):
+    is_late = (
+        today.day > LATE_FEE_START_DAY
+        and balance > 0
+        and (monthly_rent_charge is None or month_to_date_payments < monthly_rent_charge)
+    )
+    days_late = today.day - LATE_FEE_START_DAY if is_late else 0
+    return days_late, days_late * LATE_FEE_PER_DAY
+
+# Compact financial figures for one tenant from their roster entry and transactions
+def summarize_tenant_financials(tenant_data, transactions, last_payment_date, today):
+    month_start = today.replace(day=1).strftime("%Y-%m-%d")
+    this_month = [transaction for transaction in transactions if transaction.get("TransactionDate", "")[:10] >= month_start]
+    month_to_date_charges = sum(float(transaction.get("Amount", 0.00)) for transaction in this_month if transaction.get("TransactionType") != "Payment")
+    month_to_date_payments = sum(abs(float(transaction.get("Amount", 0.00))) for transaction in this_month if transaction.get("TransactionType") == "Payment")
+    monthly_rent_charge = infer_monthly_rent_charge(transactions)
+    balance = parse_money(tenant_data.get("balance", 0))
+    days_late, accrued_late_fee = late_status(balance, monthly_rent_charge, month_to_date_payments, today)
+    return {
+        "tenant_name": None,  # Filled in by the caller from the tenant_key
+        "park": tenant_data.get("park", {}).get("name", "Unknown Park"),
+        "balance": balance,
+        "monthly_rent_charge": monthly_rent_charge,
+        "last_payment_date": last_payment_date,
+        "month": today.strftime("%Y-%m"),
+        "month_to_date_charges": round(month_to_date_charges, 2),
+        "month_to_date_payments": round(month_to_date_payments, 2),
+        "days_late": days_late,
+        "accrued_late_fee": accrued_late_fee,
+        "computed_at": datetime.datetime.now().isoformat()
+    }
+
+# Persistent per-tenant financial summaries, refreshed incrementally by a bounded-parallel batch job
+class FinancialSummaryStore:
+    def __init__(self, path, max_workers, max_age_hours):
+        self.path = path
+        self.max_workers = max_workers
+        self.max_age = datetime.timedelta(hours=max_age_hours)
+        self.lock = threading.Lock()
+        self.batch_lock = threading.Lock()
+        self.summaries = {}  # Maps str(tenant_id) to the summary dict from summarize_tenant_financials
+        self.last_run = {}
+        self.stale_reads = 0
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    self.summaries = json.load(f)
+                logger.info(f"Loaded {len(self.summaries)} financial summaries from file")
+        except Exception as e:
+            logger.error(f"Error loading financial summaries from file: {str(e)}")
+            self.summaries = {}
+
+    def save(self):
+        try:
+            with self.lock:
+                data = dict(self.summaries)
+            temp_file = f"{self.path}.tmp"
+            with open(temp_file, "w") as f:
+                json.dump(data, f)
+            os.replace(temp_file, self.path)
+            logger.info("Saved financial summaries to file")
+        except Exception as e:
+            logger.error(f"Error saving financial summaries to file: {str(e)}")
+
+    # The tenant's summary with its late figures brought up to today, or None when there's none or it's stale
+    # (balance moved on the roster, new month, or past max age) and the caller should fetch live instead
+    def current(self, tenant_key, today=None):
+        today = today or datetime.date.today()
+        with self.lock:
+            summary = self.summaries.get(str(tenant_key[0]))
+            if not summary:
+                return None
+            if self._needs_fetch(summary, TENANTS.get(tenant_key, {}), today):
+                self.stale_reads += 1
+                return None
+            summary = dict(summary)
+        summary["days_late"], summary["accrued_late_fee"] = late_status(summary["balance"], summary["monthly_rent_charge"], summary["month_to_date_payments"], today)
+        return summary
+
+    # A tenant needs a transaction fetch when their balance moved, the month rolled over or the summary is old;
+    # otherwise only the date-dependent late figures are recomputed
+    def _needs_fetch(self, summary, tenant_data, today):
+        if not summary:
+            return True
+        if summary["month"] != today.strftime("%Y-%m"):
+            return True
+        if abs(summary["balance"] - parse_money(tenant_data.get("balance", 0))) > 0.005:
+            return True
+        return datetime.datetime.now() - datetime.datetime.fromisoformat(summary["computed_at"]) > self.max_age
+
+    def _summarize(self, tenant_key, tenant_data, today):
+        transactions, last_payment_date = fetch_tenant_transactions(tenant_key[0])
+        if transactions is None:
+            return None
+        summary = summarize_tenant_financials(tenant_data, transactions, last_payment_date, today)
+        summary["tenant_name"] = f"{tenant_key[1]} {tenant_key[2]}".strip()
+        summary["unit"] = tenant_key[3]
+        return summary
+
+    # Refresh every tenant on the roster; returns the run's counters, or None if a run is already in progress
+    def run_batch(self, force=False):
+        if not self.batch_lock.acquire(blocking=False):
+            return None
+        try:
+            start_time = time.monotonic()
+            today = datetime.date.today()
+            tenants = TENANTS
+            fetched, reused, failed = 0, 0, 0
+            to_fetch = []
+            with self.lock:
+                current = {str(tenant_key[0]) for tenant_key in tenants}
+                for tenant_id in [tenant_id for tenant_id in self.summaries if tenant_id not in current]:
+                    del self.summaries[tenant_id]
+                for tenant_key, tenant_data in tenants.items():
+                    summary = self.summaries.get(str(tenant_key[0]))
+                    if force or self._needs_fetch(summary, tenant_data, today):
+                        to_fetch.append((tenant_key, tenant_data))
+                        continue
+                    # No fetch needed: bring the balance and late figures up to today
+                    summary["balance"] = parse_money(tenant_data.get("balance", 0))
+                    summary["days_late"], summary["accrued_late_fee"] = late_status(summary["balance"], summary["monthly_rent_charge"], summary["month_to_date_payments"], today)
+                    reused += 1
+
+            logger.info(f"Financial summary batch: fetching {len(to_fetch)} tenants, reusing {reused}")
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="financial-summaries") as executor:
+                futures = {executor.submit(self._summarize, tenant_key, tenant_data, today): tenant_key for tenant_key, tenant_data in to_fetch}
+                for future, tenant_key in futures.items():
+                    try:
+                        summary = future.result()
+                    except Exception as e:
+                        logger.error(f"Error summarizing finances for TenantID={tenant_key[0]}: {str(e)}")
+                        summary = None
+                    if summary is None:
+                        failed += 1
+                        continue
+                    with self.lock:
+                        self.summaries[str(tenant_key[0])] = summary
+                    fetched += 1
+
+            self.save()
+            run = {
+                "finished_at": datetime.datetime.now().isoformat(),
+                "seconds": round(time.monotonic() - start_time, 2),
+                "fetched": fetched,
+                "reused": reused,
+                "failed": failed
+            }
+            self.last_run = run
+            logger.info(f"Financial summary batch finished in {run['seconds']}s: {fetched} fetched, {reused} reused, {failed} failed")
+            return run
+        finally:
+            self.batch_lock.release()
+
+    # Run the batch on a background thread; returns False if one is already running
+    def start_batch(self, force=False):
+        if self.batch_lock.locked():
+            return False
+        threading.Thread(target=self.run_batch, kwargs={"force": force}, name="financial-summary-batch", daemon=True).start()
+        return True
+
+
+    def all(self):
+        with self.lock:
+            return {tenant_id: dict(summary) for tenant_id, summary in self.summaries.items()}
+
+    def stats(self):
+        with self.lock:
+            return {
+                "tenants": len(self.summaries),
+                "running": self.batch_lock.locked(),
+                "stale_reads": self.stale_reads,
+                "last_run": self.last_run
+            }
+
+FINANCIAL_SUMMARIES = FinancialSummaryStore(FINANCIAL_SUMMARIES_FILE, FINANCIAL_SUMMARY_MAX_WORKERS, FINANCIAL_SUMMARY_MAX_AGE_HOURS)
+FINANCIAL_SUMMARIES.load()
+
+def identify_tenant(input_text, park_hint=None):
     # Normalize the input by converting to lowercase, removing extra spaces, and replacing multiple spaces with a single space
     input_text = " ".join(input_text.split()).lower().strip()
     input_words = input_text.split()
@@ -385,33 +1772,42 @@ def identify_tenant(input_text):
     input_text_normalized = input_text.replace(" ", "")
     
     possible_matches = []
-    park_filtered_matches = []
     
     logger.info(f"Attempting to identify tenant with input: '{input_text}' (normalized: '{input_text_normalized}')")
     
-    # First, try to identify a park name or city in the input
+    # Work from one snapshot in case a roster refresh swaps TENANTS mid-search
+    tenants = TENANTS
+    partitions = TENANT_PARTITIONS
+
+    # First, try to identify a park name or city in the input (or the park's messaging number) to search only that partition
     possible_park_name = " ".join(input_words)
-    park_name_in_input = None
+    park_name_in_input = next((park_name for park_name in sorted(partitions, key=len, reverse=True) if park_name in possible_park_name), None)
     city_in_input = None
-    for tenant_key in TENANTS:
-        park_name = TENANTS[tenant_key]["park"]["name"].lower()
-        tenant_city = TENANTS[tenant_key]["address"]["city"].lower()
-        if park_name in possible_park_name:
-            park_name_in_input = park_name
-            break
-        if tenant_city and tenant_city in possible_park_name:
-            city_in_input = tenant_city
+    if not park_name_in_input and park_hint in partitions:
+        logger.info(f"Using park '{park_hint}' from the messaging number")
+        park_name_in_input = park_hint
+    if not park_name_in_input:
+        city_in_input = next((city for city in TENANT_KEYS_BY_CITY if city in possible_park_name), None)
+
+    if park_name_in_input:
+        candidates = [tenant_key for tenant_key in partitions[park_name_in_input]["tenant_keys"] if tenant_key in tenants]
+        logger.info(f"Searching park partition '{park_name_in_input}' ({len(candidates)} tenants)")
+    elif city_in_input:
+        candidates = [tenant_key for tenant_key in TENANT_KEYS_BY_CITY[city_in_input] if tenant_key in tenants]
+        logger.info(f"Searching city partition '{city_in_input}' ({len(candidates)} tenants)")
+    else:
+        candidates = list(tenants)
     
     # Check for unit matches first if the input contains digits (likely a unit number)
     contains_digits = any(char.isdigit() for char in input_text)
     if contains_digits:
         logger.debug("Input contains digits, prioritizing unit match")
-        for tenant_key in TENANTS:
+        for tenant_key in candidates:
             tenant_id, first_name, last_name, unit = tenant_key
             unit_lower = unit.lower()
             unit_normalized = unit_lower.replace(" ", "")
-            tenant_park_name = TENANTS[tenant_key]["park"]["name"].lower()
-            tenant_city = TENANTS[tenant_key]["address"]["city"].lower()
+            tenant_park_name = tenants[tenant_key]["park"]["name"].lower()
+            tenant_city = tenants[tenant_key]["address"]["city"].lower()
 
             logger.debug(f"Checking unit for TenantID={tenant_id}, Unit='{unit_lower}', UnitNormalized='{unit_normalized}'")
 
@@ -440,7 +1836,7 @@ def identify_tenant(input_text):
     # If no unit matches (or input doesn't contain digits), check for name matches
     if not possible_matches:
         logger.debug("No unit matches found, checking for name matches")
-        for tenant_key in TENANTS:
+        for tenant_key in candidates:
             tenant_id, first_name, last_name, unit = tenant_key
             # Normalize the tenant's full name: lowercase, remove extra spaces
             full_name = " ".join(f"{first_name} {last_name}".split()).lower().strip()
@@ -448,8 +1844,8 @@ def identify_tenant(input_text):
             last_name_lower = " ".join(last_name.split()).lower().strip()
             unit_lower = unit.lower()
             unit_normalized = unit_lower.replace(" ", "")
-            tenant_park_name = TENANTS[tenant_key]["park"]["name"].lower()
-            tenant_city = TENANTS[tenant_key]["address"]["city"].lower()
+            tenant_park_name = tenants[tenant_key]["park"]["name"].lower()
+            tenant_city = tenants[tenant_key]["address"]["city"].lower()
 
             logger.debug(f"Checking tenant: TenantID={tenant_id}, FullName='{full_name}', FirstName='{first_name_lower}', LastName='{last_name_lower}', Unit='{unit_lower}', UnitNormalized='{unit_normalized}', Park='{tenant_park_name}', City='{tenant_city}'")
 
@@ -490,12 +1886,12 @@ def identify_tenant(input_text):
     # If still no matches, check for combined input (e.g., "Clara Lopez 02")
     if not possible_matches:
         logger.debug("No name matches found, checking for combined input")
-        for tenant_key in TENANTS:
+        for tenant_key in candidates:
             tenant_id, first_name, last_name, unit = tenant_key
             unit_lower = unit.lower()
             unit_normalized = unit_lower.replace(" ", "")
-            tenant_park_name = TENANTS[tenant_key]["park"]["name"].lower()
-            tenant_city = TENANTS[tenant_key]["address"]["city"].lower()
+            tenant_park_name = tenants[tenant_key]["park"]["name"].lower()
+            tenant_city = tenants[tenant_key]["address"]["city"].lower()
 
             input_has_unit = any(unit_normalized == word.replace(" ", "") for word in input_words)
             full_name = " ".join(f"{first_name} {last_name}".split()).lower().strip()
@@ -508,24 +1904,6 @@ def identify_tenant(input_text):
                 possible_matches.append(tenant_key)
                 continue
 
-    # If a park name or city was identified in the input, filter matches
-    if park_name_in_input:
-        logger.info(f"Filtering matches by park name: '{park_name_in_input}'")
-        for match in possible_matches:
-            tenant_park_name = TENANTS[match]["park"]["name"].lower()
-            if park_name_in_input == tenant_park_name:
-                park_filtered_matches.append(match)
-        possible_matches = park_filtered_matches
-        logger.info(f"After park filter, possible matches: {possible_matches}")
-    elif city_in_input:
-        logger.info(f"Filtering matches by city: '{city_in_input}'")
-        for match in possible_matches:
-            tenant_city = TENANTS[match]["address"]["city"].lower()
-            if city_in_input == tenant_city:
-                park_filtered_matches.append(match)
-        possible_matches = park_filtered_matches
-        logger.info(f"After city filter, possible matches: {possible_matches}")
-
     # If there's exactly one match, return it
     if len(possible_matches) == 1:
         logger.info(f"Exactly one match found: {possible_matches[0]}")
@@ -538,9 +1916,41 @@ def identify_tenant(input_text):
         logger.info("No matches found")
         return None, None  # No match
 
-def get_ai_response(user_input, tenant_data, conversation_language, message_history=None, is_maintenance_request=False, include_transactions=True, check_for_end=False):
-    start_time = datetime.datetime.now()
-    
+# Identify a tenant from a burst of messages: the combined text first, then each message on its own (newest first)
+# Returns (tenant_key, possible_matches, questions) where questions are the fragments left to answer once identified
+def identify_tenant_from_messages(messages, park_hint=None):
+    # Greetings never identify anyone (and "hi" would substring-match names like "Sophie")
+    fragments = [message for message in messages if not is_filler_message(message)]
+    if not fragments:
+        return None, None, []
+    tenant_key, possible_matches = identify_tenant(" ".join(fragments), park_hint)
+    if len(fragments) == 1:
+        return tenant_key, possible_matches, []
+    if tenant_key:
+        # The joined burst named the tenant; any fragment that isn't part of the introduction is a question
+        questions = [fragment for fragment in fragments if not is_identifying_fragment(fragment, tenant_key)]
+        return tenant_key, possible_matches, questions
+    for index in reversed(range(len(fragments))):
+        candidate_key, candidate_matches = identify_tenant(fragments[index], park_hint)
+        if candidate_key:
+            logger.info(f"Identified tenant from individual burst message '{fragments[index]}': {candidate_key}")
+            questions = [fragment for fragment in fragments[:index] + fragments[index + 1:] if not is_identifying_fragment(fragment, candidate_key)]
+            return candidate_key, None, questions
+        possible_matches = possible_matches or candidate_matches
+    return None, possible_matches, []
+
+# A short fragment naming the tenant or their unit ("this is maria", "lot 12") is part of identifying, not a question
+def is_identifying_fragment(fragment, tenant_key):
+    words = fragment.lower().split()
+    if len(words) > SMS_BURST_OPENER_MAX_WORDS:
+        return False
+    tenant_id, first_name, last_name, unit = tenant_key
+    text = "".join(words)
+    unit_normalized = unit.lower().replace(" ", "")
+    return bool(unit_normalized) and unit_normalized in text or any(word in first_name.lower().split() + last_name.lower().split() for word in words)
+
+# Build the xAI chat completion payload for a tenant query (or for the end-of-conversation check)
+def build_xai_payload(user_input, tenant_data, conversation_language, message_history=None, include_transactions=True, check_for_end=False, voice=False):
     # Include the full tenant_data and park_details in the prompt (no exclusions)
     park_details = tenant_data.get("park", {
         "name": "Unknown Park",
@@ -576,15 +1986,13 @@ def get_ai_response(user_input, tenant_data, conversation_language, message_hist
     # If the query is about rent, try to infer the monthly rent charge from transactions
     monthly_rent_charge = None
     if "rent" in user_input.lower() and include_transactions:
-        for transaction in transactions:
-            if "rent" in transaction.get("Comment", "").lower() and transaction.get("TransactionType") != "Payment":
-                monthly_rent_charge = float(transaction.get("Amount", 0.00))
-                break
-    else:
-        monthly_rent_charge = None
+        monthly_rent_charge = infer_monthly_rent_charge(transactions)
+    if monthly_rent_charge is None and "rent" in user_input.lower():
+        # Fall back to the precomputed financial summary
+        monthly_rent_charge = tenant_data.get("monthly_rent_charge")
 
     if filtered_transactions and include_transactions:
-        filtered_transactions.sort(key=lambda x: x.get("TransactionDate", ""), reverse=True)
+        filtered_transactions = sorted(filtered_transactions, key=lambda x: x.get("TransactionDate", ""), reverse=True)
     
     # Create a copy of tenant_data without transactions to avoid double-counting
     tenant_data_copy = tenant_data.copy()
@@ -623,75 +2031,141 @@ def get_ai_response(user_input, tenant_data, conversation_language, message_hist
         prompt += f"\nStatement period (if applicable): {statement_period}."
     prompt_length = len(prompt)
     logger.debug(f"Prompt length: {prompt_length} characters")
-    
-    @retry(
-        stop=stop_after_attempt(2),
-        wait=wait_exponential(multiplier=1, min=3, max=6),
-        retry=retry_if_exception_type(Exception)
+
+    logger.info(f"Generating AI response for conversation_language: {conversation_language}")
+    system_prompt = (
+        "You are a professional mobile home park manager assisting tenants across multiple mobile home parks. "
+        "Respond in a natural, conversational tone as a human would, without explicitly stating your role. "
+        "If 'Conversation language' is 'es', respond in Spanish. Otherwise, respond in English. "
+        "Ensure responses flow seamlessly as part of an ongoing conversation, avoiding repetitive greetings like 'Hey there' after the initial message. "
+        "Provide concise, actionable responses tailored to the tenant’s specific park, provided as 'Tenant is from park: {park_details}'. "
+        "Use the tenant's full transaction history ('All transactions: {transactions}') for payment-related queries. "
+        "For financial queries (e.g., balance, rent charge, payment history), use the tenant's balance, due date, monthly rent charge, and transaction history. "
+        "If the query is about the tenant's rent (e.g., 'What is my rent?'), use the 'Monthly rent charge' provided in the prompt if available; otherwise, infer it from the transaction history by identifying recurring charges labeled as 'rent'. "
+        "For example, if asked 'What did I pay last month?', calculate the total payments made last month from the transaction history. "
+        "If asked for a statement (e.g., 'Give me my statement'), generate a detailed statement for the 'Statement period' (if provided), including all charges and payments within that period, and calculate the resulting balance. Format the statement clearly, e.g., 'Here’s your statement for [period]: Charges: [list charges with dates and amounts], Payments: [list payments with dates and amounts], Total Balance: [amount].' "
+        "If asked about the rent charge, use the 'Monthly rent charge' if available, or infer from transaction history. "
+        "For payment policies, state that tenants can be evicted for not paying utilities or other fees, as non-payment of any charges can lead to eviction. "
+        "Do not suggest payment plans; encourage immediate payment or direct to the park office. "
+        "For maintenance requests, confirm the issue is logged and provide a next step (e.g., scheduling a repair). "
+        "Only say the owner has been notified if the tenant data's 'maintenance_request' has 'owner_notification' set to 'paged now'; "
+        "otherwise say the request is on the owner's list for the next maintenance review. "
+        "For other queries, respond using park-specific details (e.g., payment_methods, payment_procedure, payee). "
+        "If lacking details, respond with: 'I’m sorry, I don’t have that information. Please contact the park office at (504) 313-0024, available Monday to Friday, 9 AM to 5 PM, for more details.' (in English) or 'Lo siento, no tengo esa información. Por favor, contacta a la oficina del parque al (504) 313-0024, disponible de lunes a viernes, de 9 AM a 5 PM, para más detalles.' (in Spanish). "
+        "Do not make up information. "
     )
-    def call_xai():
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {XAI_API_KEY}"
-        }
-        logger.info(f"Generating AI response for conversation_language: {conversation_language}")
-        system_prompt = (
-            "You are a professional mobile home park manager assisting tenants across multiple mobile home parks. "
-            "Respond in a natural, conversational tone as a human would, without explicitly stating your role. "
-            "If 'Conversation language' is 'es', respond in Spanish. Otherwise, respond in English. "
-            "Ensure responses flow seamlessly as part of an ongoing conversation, avoiding repetitive greetings like 'Hey there' after the initial message. "
-            "Provide concise, actionable responses tailored to the tenant’s specific park, provided as 'Tenant is from park: {park_details}'. "
-            "Use the tenant's full transaction history ('All transactions: {transactions}') for payment-related queries. "
-            "For financial queries (e.g., balance, rent charge, payment history), use the tenant's balance, due date, monthly rent charge, and transaction history. "
-            "If the query is about the tenant's rent (e.g., 'What is my rent?'), use the 'Monthly rent charge' provided in the prompt if available; otherwise, infer it from the transaction history by identifying recurring charges labeled as 'rent'. "
-            "For example, if asked 'What did I pay last month?', calculate the total payments made last month from the transaction history. "
-            "If asked for a statement (e.g., 'Give me my statement'), generate a detailed statement for the 'Statement period' (if provided), including all charges and payments within that period, and calculate the resulting balance. Format the statement clearly, e.g., 'Here’s your statement for [period]: Charges: [list charges with dates and amounts], Payments: [list payments with dates and amounts], Total Balance: [amount].' "
-            "If asked about the rent charge, use the 'Monthly rent charge' if available, or infer from transaction history. "
-            "For payment policies, state that tenants can be evicted for not paying utilities or other fees, as non-payment of any charges can lead to eviction. "
-            "Do not suggest payment plans; encourage immediate payment or direct to the park office. "
-            "For maintenance requests, confirm the issue is logged, the owner is notified, and provide a next step (e.g., scheduling a repair). "
-            "For other queries, respond using park-specific details (e.g., payment_methods, payment_procedure, payee). "
-            "If lacking details, respond with: 'I’m sorry, I don’t have that information. Please contact the park office at (504) 313-0024, available Monday to Friday, 9 AM to 5 PM, for more details.' (in English) or 'Lo siento, no tengo esa información. Por favor, contacta a la oficina del parque al (504) 313-0024, disponible de lunes a viernes, de 9 AM a 5 PM, para más detalles.' (in Spanish). "
-            "Do not make up information. "
+    if check_for_end:
+        system_prompt += (
+            "Based on the conversation history and the current query, determine if the tenant intends to end the conversation. "
+            "Look for phrases like 'He terminado', 'Eso es todo', 'Gracias', 'Adiós', 'I'm done', 'That's all', 'Thank you', 'Goodbye', etc. "
+            "If the tenant wants to end, respond with 'END_CONVERSATION'. Otherwise, respond with 'CONTINUE'."
         )
-        if check_for_end:
-            system_prompt += (
-                "Based on the conversation history and the current query, determine if the tenant intends to end the conversation. "
-                "Look for phrases like 'He terminado', 'Eso es todo', 'Gracias', 'Adiós', 'I'm done', 'That's all', 'Thank you', 'Goodbye', etc. "
-                "If the tenant wants to end, respond with 'END_CONVERSATION'. Otherwise, respond with 'CONTINUE'."
-            )
+    else:
+        system_prompt += (
+            "Provide a helpful response to the tenant’s query, considering the conversation history for context."
+        )
+    if voice:
+        # Phone replies are read aloud, so keep them short and plain
+        system_prompt += (
+            " This is a phone call: answer in at most two short sentences of plain speech, without lists, formatting or statements."
+        )
+    payload = {
+        "messages": [
+            {
+                "role": "system",
+                "content": system_prompt
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "model": "grok-3-fast-beta",
+        "stream": False,
+        "temperature": 0.5,
+        "max_tokens": VOICE_MAX_TOKENS if voice else 500
+    }
+    return payload
+
+# Pull the reply text out of an xAI chat completion response
+def extract_ai_reply(response, check_for_end=False):
+    reply = response["choices"][0]["message"]["content"].strip()
+    if check_for_end:
+        logger.info(f"Intent detection response: {reply}")
+    else:
+        logger.info(f"AI response: {reply}")
+    return reply
+
+# Canned reply used when the xAI call fails
+def fallback_ai_response(user_input, tenant_data, conversation_language, is_maintenance_request=False, check_for_end=False):
+    if check_for_end:
+        return "CONTINUE"  # Default to continuing if intent check fails
+    if any(keyword in user_input.lower() for keyword in ["balance", "pay", "due", "payment history", "last payment", "recent transactions", "last month", "rent charge", "statement"]):
+        if conversation_language == "es":
+            return f"No pude procesar tu solicitud por completo, pero puedo decirte que tu saldo actual es {tenant_data['balance']}, con vencimiento el {tenant_data['due_date']} de cada mes. Para más detalles, intenta de nuevo más tarde o contacta a la oficina del parque al {PARK_OFFICE_PHONE}, disponible {PARK_OFFICE_HOURS}."
         else:
-            system_prompt += (
-                "Provide a helpful response to the tenant’s query, considering the conversation history for context."
-            )
-        payload = {
-            "messages": [
-                {
-                    "role": "system",
-                    "content": system_prompt
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "model": "grok-3-fast-beta",
-            "stream": False,
-            "temperature": 0.5,
-            "max_tokens": 500
-        }
-        try:
+            return f"I couldn’t process your request fully, but I can tell you that your current balance is {tenant_data['balance']}, due on the {tenant_data['due_date']} of each month. For more details, please try again later or contact the park office at {PARK_OFFICE_PHONE}, available {PARK_OFFICE_HOURS}."
+    elif is_maintenance_request:
+        owner_paged = tenant_data.get("maintenance_request", {}).get("owner_notification") == "paged now"
+        if conversation_language == "es":
+            notified = "he notificado al propietario" if owner_paged else "está en la lista del propietario para la próxima revisión de mantenimiento"
+            return f"Lamento escuchar sobre tu problema. He registrado tu solicitud y {notified}. El equipo de mantenimiento te contactará pronto para programar una reparación."
+        else:
+            notified = "notified the owner" if owner_paged else "added it to the owner's list for the next maintenance review"
+            return f"I’m sorry to hear about your issue. I’ve logged your request and {notified}. The maintenance team will contact you soon to schedule a repair."
+    else:
+        if conversation_language == "es":
+            return f"Lo siento, no pude procesar tu solicitud en este momento. Por favor, intenta de nuevo más tarde o contacta a la oficina del parque al {PARK_OFFICE_PHONE}, disponible {PARK_OFFICE_HOURS}."
+        else:
+            return f"I’m sorry, I couldn’t process your request at this time. Please try again later or contact the park office at {PARK_OFFICE_PHONE}, available {PARK_OFFICE_HOURS}."
+
+# xAI call policy shared by the threaded and async pipelines: two attempts a few seconds apart,
+# identical prompts in flight at the same time share one completion, and every call's latency feeds admission control
+retry_xai_call = retry(
+    stop=stop_after_attempt(2),
+    wait=wait_exponential(multiplier=1, min=3, max=6),
+    retry=retry_if_exception_type(Exception)
+)
+
+def xai_headers():
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {XAI_API_KEY}"
+    }
+
+def xai_coalescing_key(payload):
+    return ("xai", hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest())
+
+def record_xai_latency(xai_start_time, succeeded):
+    elapsed = (datetime.datetime.now() - xai_start_time).total_seconds()
+    ADMISSION.observe_latency(elapsed)
+    if succeeded:
+        logger.info(f"xAI API call completed in {elapsed * 1000:.2f} ms")
+
+def get_ai_response(user_input, tenant_data, conversation_language, message_history=None, is_maintenance_request=False, include_transactions=True, check_for_end=False, voice=False):
+    start_time = datetime.datetime.now()
+    payload = build_xai_payload(user_input, tenant_data, conversation_language, message_history, include_transactions, check_for_end, voice)
+
+    @retry_xai_call
+    def call_xai():
+        def post_to_xai():
             xai_start_time = datetime.datetime.now()
-            response = requests.post("https://api.x.ai/v1/chat/completions", headers=headers, json=payload, timeout=60)
-            response.raise_for_status()
-            xai_end_time = datetime.datetime.now()
-            logger.info(f"xAI API call completed in {(xai_end_time - xai_start_time).total_seconds() * 1000:.2f} ms")
-            return response.json()
+            succeeded = False
+            try:
+                response = requests.post(XAI_API_URL, headers=xai_headers(), json=payload, timeout=60)
+                response.raise_for_status()
+                succeeded = True
+                return response.json()
+            finally:
+                record_xai_latency(xai_start_time, succeeded)
+
+        try:
+            return UPSTREAM_CALLS.do(xai_coalescing_key(payload), post_to_xai, timeout=XAI_COALESCE_TIMEOUT_SECONDS)
         except requests.exceptions.HTTPError as e:
             error_message = f"HTTPError in call_xai: Status Code: {e.response.status_code}, Response Text: {e.response.text}"
             logger.error(error_message)
             raise Exception(error_message)
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, TimeoutError) as e:
             error_message = f"RequestException in call_xai: {str(e)}"
             logger.error(error_message)
             raise Exception(error_message)
@@ -704,32 +2178,10 @@ def get_ai_response(user_input, tenant_data, conversation_language, message_hist
         response = call_xai()
         end_time = datetime.datetime.now()
         logger.info(f"get_ai_response completed in {(end_time - start_time).total_seconds() * 1000:.2f} ms")
-        if check_for_end:
-            intent_response = response["choices"][0]["message"]["content"].strip()
-            logger.info(f"Intent detection response: {intent_response}")
-            return intent_response
-        reply = response["choices"][0]["message"]["content"].strip()
-        logger.info(f"AI response: {reply}")
-        return reply
+        return extract_ai_reply(response, check_for_end)
     except Exception as e:
         logger.error(f"Error in get_ai_response after retries: {str(e)}")
-        if check_for_end:
-            return "CONTINUE"  # Default to continuing if intent check fails
-        if any(keyword in user_input.lower() for keyword in ["balance", "pay", "due", "payment history", "last payment", "recent transactions", "last month", "rent charge", "statement"]):
-            if conversation_language == "es":
-                return f"No pude procesar tu solicitud por completo, pero puedo decirte que tu saldo actual es {tenant_data['balance']}, con vencimiento el {tenant_data['due_date']} de cada mes. Para más detalles, intenta de nuevo más tarde o contacta a la oficina del parque al {PARK_OFFICE_PHONE}, disponible {PARK_OFFICE_HOURS}."
-            else:
-                return f"I couldn’t process your request fully, but I can tell you that your current balance is {tenant_data['balance']}, due on the {tenant_data['due_date']} of each month. For more details, please try again later or contact the park office at {PARK_OFFICE_PHONE}, available {PARK_OFFICE_HOURS}."
-        elif is_maintenance_request:
-            if conversation_language == "es":
-                return "Lamento escuchar sobre tu problema. He registrado tu solicitud y he notificado al propietario. El equipo de mantenimiento te contactará pronto para programar una reparación."
-            else:
-                return "I’m sorry to hear about your issue. I’ve logged your request and notified the owner. The maintenance team will contact you soon to schedule a repair."
-        else:
-            if conversation_language == "es":
-                return f"Lo siento, no pude procesar tu solicitud en este momento. Por favor, intenta de nuevo más tarde o contacta a la oficina del parque al {PARK_OFFICE_PHONE}, disponible {PARK_OFFICE_HOURS}."
-            else:
-                return f"I’m sorry, I couldn’t process your request at this time. Please try again later or contact the park office at {PARK_OFFICE_PHONE}, available {PARK_OFFICE_HOURS}."
+        return fallback_ai_response(user_input, tenant_data, conversation_language, is_maintenance_request, check_for_end)
 
 def send_sms(to_number, message):
     recipient = to_number
@@ -771,243 +2223,1692 @@ def home():
 def keep_alive():
     return "App is awake!"
 
-# Endpoint to manually refresh tenant data
+# Endpoint to manually refresh tenant data (every location, or one with ?location=ID)
 @app.route("/refresh_tenants", methods=["GET"])
 def refresh_tenants():
-    global TENANTS
-    TENANTS = fetch_tenants_from_rent_manager()
+    location_id = request.args.get("location")
+    if location_id and location_id not in RENT_MANAGER_LOCATION_IDS:
+        return f"Unknown location {location_id}.", 404
+    results = refresh_location_rosters([location_id] if location_id else RENT_MANAGER_LOCATION_IDS)
+    failed = [failed_location for failed_location, refreshed in results.items() if not refreshed]
+    if len(failed) == len(results):
+        logger.error("Tenant refresh failed; keeping the previous tenant data")
+        return "Tenant refresh failed; keeping the previous tenant data.", 502
+    # Balances may have moved, so bring the financial summaries up to date in the background
+    FINANCIAL_SUMMARIES.start_batch()
+    if failed:
+        return f"Tenants refreshed for {len(results) - len(failed)} of {len(results)} locations; kept the previous tenant data for location(s) {', '.join(failed)}."
     return "Tenants refreshed successfully!"
 
 # Endpoint to check for inactive conversations (to be called by a cron job)
 @app.route("/check_inactive_conversations", methods=["GET"])
 def check_inactive_conversations():
-    load_conversations()
     current_time = datetime.datetime.now()
-    conversations_to_close = []
-    
+
     logger.info(f"Checking for inactive conversations at {current_time}")
-    for phone_number, conversation in list(CURRENT_CONVERSATIONS.items()):
-        if "last_message_time" not in conversation:
-            logger.info(f"Skipping conversation for {phone_number}: No last_message_time")
-            continue
-        last_message_time = conversation["last_message_time"]
-        time_delta = (current_time - last_message_time).total_seconds() / 60.0
-        logger.info(f"Conversation for {phone_number}: Last message at {last_message_time}, Time delta: {time_delta:.2f} minutes")
-
-        language = conversation.get("initial_language", "en")  # Use initial_language
-        if language == "es":
-            inactivity_message = "Ha pasado un tiempo desde tu último mensaje. ¿Hay algo más en lo que pueda ayudarte? Si no, cerraré esta conversación."
-            closure_message = "No he recibido respuesta. He cerrado esta conversación. Si necesitas más ayuda, no dudes en contactarme."
-        else:
-            inactivity_message = "It’s been a while since your last message. Is there anything else I can assist you with? If not, I’ll close this conversation."
-            closure_message = "No response received. I’ve closed this conversation. Feel free to reach out if you need further assistance."
-
-        if time_delta >= 2 and not conversation.get("pending_end", False):  # Reduced to 2 minutes
-            conversation["pending_end"] = True
-            conversation["pending_end_time"] = current_time
-            send_sms(phone_number, inactivity_message)
-            logger.info(f"Inactivity timeout triggered for {phone_number} by cron job")
-            save_conversations()
+    with CONVERSATIONS_LOCK:
+        phone_numbers = list(CURRENT_CONVERSATIONS.keys())
+    for phone_number in phone_numbers:
+        # A conversation whose messages are being processed right now isn't inactive; check it next time
+        with PHONE_LOCKS.try_hold(phone_number) as acquired:
+            if not acquired:
+                logger.info(f"Skipping conversation for {phone_number}: message processing in progress")
+                continue
+            check_conversation_inactivity(phone_number, current_time)
 
-        if conversation.get("pending_end", False):
-            pending_end_time = conversation["pending_end_time"]
-            end_delta = (current_time - pending_end_time).total_seconds() / 60.0
-            logger.info(f"Conversation for {phone_number}: Pending end at {pending_end_time}, End delta: {end_delta:.2f} minutes")
-            if end_delta >= 1:
-                conversations_to_close.append(phone_number)
-
-    for phone_number in conversations_to_close:
-        if phone_number in CURRENT_CONVERSATIONS:
-            language = CURRENT_CONVERSATIONS[phone_number].get("initial_language", "en")
-            if language == "es":
-                closure_message = "No he recibido respuesta. He cerrado esta conversación. Si necesitas más ayuda, no dudes en contactarme."
-            else:
-                closure_message = "No response received. I’ve closed this conversation. Feel free to reach out if you need further assistance."
-            del CURRENT_CONVERSATIONS[phone_number]
-            if phone_number in PENDING_IDENTIFICATION:
-                del PENDING_IDENTIFICATION[phone_number]
+    return "Checked for inactive conversations"
+
+# Prompt or close one inactive conversation; the caller holds the phone number's lock
+def check_conversation_inactivity(phone_number, current_time):
+    conversation = CURRENT_CONVERSATIONS.get(phone_number)
+    if conversation is None:
+        return
+    if "last_message_time" not in conversation:
+        logger.info(f"Skipping conversation for {phone_number}: No last_message_time")
+        return
+    last_message_time = conversation["last_message_time"]
+    time_delta = (current_time - last_message_time).total_seconds() / 60.0
+    logger.info(f"Conversation for {phone_number}: Last message at {last_message_time}, Time delta: {time_delta:.2f} minutes")
+
+    language = conversation.get("language", conversation.get("initial_language", "en"))
+    if language == "es":
+        inactivity_message = "Ha pasado un tiempo desde tu último mensaje. ¿Hay algo más en lo que pueda ayudarte? Si no, cerraré esta conversación."
+        closure_message = "No he recibido respuesta. He cerrado esta conversación. Si necesitas más ayuda, no dudes en contactarme."
+    else:
+        inactivity_message = "It’s been a while since your last message. Is there anything else I can assist you with? If not, I’ll close this conversation."
+        closure_message = "No response received. I’ve closed this conversation. Feel free to reach out if you need further assistance."
+
+    if time_delta >= 2 and not conversation.get("pending_end", False):  # Reduced to 2 minutes
+        conversation["pending_end"] = True
+        conversation["pending_end_time"] = current_time
+        send_sms(phone_number, inactivity_message)
+        logger.info(f"Inactivity timeout triggered for {phone_number} by cron job")
+        save_conversations()
+
+    if conversation.get("pending_end", False):
+        pending_end_time = conversation["pending_end_time"]
+        end_delta = (current_time - pending_end_time).total_seconds() / 60.0
+        logger.info(f"Conversation for {phone_number}: Pending end at {pending_end_time}, End delta: {end_delta:.2f} minutes")
+        if end_delta >= 1:
+            end_conversation(phone_number)
             send_sms(phone_number, closure_message)
             logger.info(f"Conversation closed for {phone_number} by cron job due to no response after end prompt")
             save_conversations()
 
-    return "Checked for inactive conversations"
+# Endpoint to inspect runtime counters
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return {
+        "message_dedup": MESSAGE_DEDUP.stats(),
+        "message_bursts": MESSAGE_BURSTS.stats(),
+        "transaction_prefetch": TRANSACTION_PREFETCH.stats(),
+        "rent_manager_session": RENT_MANAGER_SESSION.stats(),
+        "upstream_coalescing": UPSTREAM_CALLS.stats(),
+        "async_engine": ASYNC_ENGINE.stats(),
+        "tenant_roster": roster_stats(),
+        "park_hints": len(PARK_HINTS),
+        "rent_manager_transfers": RENT_MANAGER_TRANSFERS.stats(),
+        "maintenance": MAINTENANCE_STORE.stats(),
+        "admission": ADMISSION.stats(),
+        "voice": voice_stats(),
+        "financial_summaries": FINANCIAL_SUMMARIES.stats()
+    }
+
+# Restrict an endpoint to the owner: tenant names, phone numbers and balances are behind it
+def require_owner_credentials(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not OWNER_API_TOKEN:
+            logger.warning(f"Refused {request.path}: OWNER_API_TOKEN is not set")
+            return "Owner endpoints are disabled until OWNER_API_TOKEN is set.", 503
+        authorization = request.headers.get("Authorization", "")
+        token = authorization[len("Bearer "):] if authorization.startswith("Bearer ") else ""
+        if not hmac.compare_digest(token.encode(), OWNER_API_TOKEN.encode()):
+            logger.warning(f"Refused {request.path}: missing or invalid owner credentials")
+            return "Unauthorized", 401
+        return view(*args, **kwargs)
+    return wrapper
+
+# Endpoint to rebuild the per-tenant financial summaries (to be called by a cron job; ?full=true refetches everyone)
+@app.route("/refresh_financial_summaries", methods=["GET"])
+@require_owner_credentials
+def refresh_financial_summaries():
+    force = request.args.get("full", "false").lower() == "true"
+    if request.args.get("wait", "false").lower() == "true":
+        run = FINANCIAL_SUMMARIES.run_batch(force=force)
+        return run if run else ("A financial summary refresh is already running.", 409)
+    if not FINANCIAL_SUMMARIES.start_batch(force=force):
+        return "A financial summary refresh is already running.", 409
+    return "Financial summary refresh started"
+
+# Owner report: tenants who are late as of the last summary refresh (?min_days=N, ?park=Name)
+@app.route("/owner_reports/late_tenants", methods=["GET"])
+@require_owner_credentials
+def late_tenants_report():
+    min_days = request.args.get("min_days", "1")
+    if not min_days.isdigit():
+        return "min_days must be a whole number of days.", 400
+    min_days = int(min_days)
+    park = request.args.get("park")
+    late = [
+        dict(summary, tenant_id=tenant_id) for tenant_id, summary in FINANCIAL_SUMMARIES.all().items()
+        if summary["days_late"] >= min_days and (park is None or summary["park"].lower() == park.lower())
+    ]
+    late.sort(key=lambda summary: (summary["accrued_late_fee"], summary["balance"]), reverse=True)
+    return {
+        "late_fee_start_day": LATE_FEE_START_DAY,
+        "late_fee_per_day": LATE_FEE_PER_DAY,
+        "count": len(late),
+        "total_balance": round(sum(summary["balance"] for summary in late), 2),
+        "total_accrued_late_fees": sum(summary["accrued_late_fee"] for summary in late),
+        "tenants": late
+    }
+
+# Owner report: month-to-date totals per park from the financial summaries
+@app.route("/owner_reports/financial_summary", methods=["GET"])
+@require_owner_credentials
+def financial_summary_report():
+    parks = {}
+    for summary in FINANCIAL_SUMMARIES.all().values():
+        totals = parks.setdefault(summary["park"], {
+            "tenants": 0, "total_balance": 0.0, "late_tenants": 0, "accrued_late_fees": 0,
+            "month_to_date_charges": 0.0, "month_to_date_payments": 0.0
+        })
+        totals["tenants"] += 1
+        totals["total_balance"] = round(totals["total_balance"] + summary["balance"], 2)
+        totals["late_tenants"] += 1 if summary["days_late"] > 0 else 0
+        totals["accrued_late_fees"] += summary["accrued_late_fee"]
+        totals["month_to_date_charges"] = round(totals["month_to_date_charges"] + summary["month_to_date_charges"], 2)
+        totals["month_to_date_payments"] = round(totals["month_to_date_payments"] + summary["month_to_date_payments"], 2)
+    return {"as_of": FINANCIAL_SUMMARIES.stats()["last_run"].get("finished_at"), "parks": parks}
+
+# Endpoint to send the owner the batched maintenance digest (to be called by a cron job)
+@app.route("/send_maintenance_digest", methods=["GET"])
+def send_maintenance_digest_route():
+    sent = send_maintenance_digest()
+    return f"Sent maintenance digest with {sent} requests" if sent else "No maintenance digest due"
+
+# Endpoint to list maintenance requests (open by default; ?status=all for every request, plus optional park, category and urgent filters)
+@app.route("/maintenance_requests", methods=["GET"])
+@require_owner_credentials
+def list_maintenance_requests():
+    status = request.args.get("status", "open")
+    urgent = request.args.get("urgent")
+    maintenance_requests = MAINTENANCE_STORE.query(
+        status=None if status == "all" else status,
+        park=request.args.get("park"),
+        category=request.args.get("category"),
+        urgent=None if urgent is None else urgent.lower() == "true"
+    )
+    return {"count": len(maintenance_requests), "requests": maintenance_requests}
+
+# Endpoint to close a maintenance request once it's been handled
+@app.route("/maintenance_requests/<int:request_id>/close", methods=["POST"])
+@require_owner_credentials
+def close_maintenance_request(request_id):
+    maintenance_request = MAINTENANCE_STORE.close(request_id)
+    if not maintenance_request:
+        return f"Maintenance request #{request_id} not found.", 404
+    return maintenance_request
 
 @app.route("/sms", methods=["POST"])
 def sms_reply():
     logger.info("Received SMS request")
+    message_sid = request.values.get("MessageSid")
     from_number = request.values.get("From")
     message = request.values.get("Body").strip()
-    logger.info(f"From: {from_number}, Message: {message}")
+    logger.info(f"From: {from_number}, MessageSid: {message_sid}, Message: {message}")
+    note_messaging_number(from_number, request.values.get("To"))
 
-    current_time = datetime.datetime.now()
+    # Short-circuit Twilio retries of a delivery we've already seen
+    if message_sid:
+        is_new, outcome = MESSAGE_DEDUP.claim(message_sid)
+        if not is_new:
+            logger.info(f"Suppressed duplicate delivery of {message_sid} from {from_number} (original {'completed' if outcome else 'still in progress'})")
+            return outcome or "OK"
 
-    if from_number not in CURRENT_CONVERSATIONS:
-        try:
-            language = langdetect.detect(message)
-            if language != 'es':
-                language = 'en'
-            logger.info(f"Detected language: {language} for message: '{message}'")
-        except Exception as e:
-            logger.warning(f"Language detection failed for message '{message}': {str(e)}. Defaulting to English.")
-            language = "en"
-        PENDING_IDENTIFICATION[from_number] = {"state": "awaiting_identification", "pending_message": message}
+    try:
+        if ASYNC_PIPELINE:
+            # The async engine coalesces, serializes and processes the message; Twilio only needs the acknowledgement
+            ASYNC_ENGINE.submit(from_number, message)
+            outcome = "OK"
+        else:
+            messages = MESSAGE_BURSTS.collect(from_number, message)
+            if messages is None:
+                logger.info(f"Merged message from {from_number} into a pending burst")
+                outcome = "OK"
+            else:
+                outcome = admit_and_process(from_number, messages)
+    except Exception:
+        if message_sid:
+            MESSAGE_DEDUP.release(message_sid)
+        raise
+    if message_sid:
+        MESSAGE_DEDUP.complete(message_sid, outcome)
+    return outcome
+
+# Keywords that route a message to the financial and maintenance paths
+FINANCIAL_KEYWORDS = ["balance", "pay", "due", "payment history", "last payment", "recent transactions", "last month", "rent charge", "statement", "charge for", "rent"]
+MAINTENANCE_KEYWORDS = ["maintenance", "fix", "broken", "broke", "damage", "damaged", "repair", "arreglar", "roto", "rota"]
+
+# Whole-word (or whole-phrase) match, so "gas" doesn't match "Vegas" and "bye" doesn't match "maybe"
+def mentions_any(message, phrases):
+    text = " ".join(re.findall(r"[\w']+", message.lower().replace("’", "'")))
+    return any(re.search(rf"\b{re.escape(phrase)}\b", text) for phrase in phrases)
+
+def is_financial_query(message):
+    return any(keyword in message.lower() for keyword in FINANCIAL_KEYWORDS)
+
+# Any maintenance category keyword counts too, so "I smell gas" is a maintenance report
+def is_maintenance_request(message):
+    return mentions_any(message, MAINTENANCE_KEYWORDS) or classify_maintenance_issue(message) != "general"
+
+# Questions about a recent payment ("did you get my payment?") must see live transactions, never a cached copy
+PAYMENT_CHECK_KEYWORDS = ["paid", "payment", "pagué", "pague", "pago"]
+
+def is_payment_question(message):
+    return any(keyword in message.lower() for keyword in PAYMENT_CHECK_KEYWORDS)
+
+# Questions that need the transaction list itself rather than the precomputed financial summary
+TRANSACTION_DETAIL_KEYWORDS = ["statement", "payment history", "recent transactions", "transactions", "last month", "charge for", "history"]
+
+# Payment questions and stale summaries always go to the live transactions
+def needs_transactions(tenant_key, message):
+    if is_payment_question(message):
+        return True
+    if not is_financial_query(message):
+        return False
+    return FINANCIAL_SUMMARIES.current(tenant_key) is None or any(keyword in message.lower() for keyword in TRANSACTION_DETAIL_KEYWORDS)
+
+# The tenant says they were matched to someone else ("not me", "no soy yo")
+NOT_ME_PHRASES = ["not me", "wrong person", "not my account", "that's not me", "that isn't me", "this isn't me", "no soy yo", "persona equivocada", "no es mi cuenta"]
+
+def is_not_me_message(message):
+    return mentions_any(message, NOT_ME_PHRASES)
+
+# Admission priority class: urgent maintenance first, then other maintenance, then everything else
+def message_priority(message):
+    if not is_maintenance_request(message):
+        return "normal"
+    return "emergency" if classify_maintenance_issue(message) in URGENT_MAINTENANCE_CATEGORIES else "maintenance"
+
+# Reply texts shared by the SMS pipelines
+def identification_prompt_text(language):
+    if language == "es":
+        return "Por favor, identifícate con tu nombre, apellido o número de unidad (por ejemplo, Juan Pérez, Unidad 5)."
+    return "Please identify yourself with your first name, last name, or unit number (e.g., John Doe, Unit 5)."
+
+def identified_text(language, first_name):
+    if language == "es":
+        return f"¡Gracias {first_name}! Te he identificado (si no eres {first_name}, responde NO SOY YO)."
+    return f"Thanks {first_name}! I’ve identified you (if you’re not {first_name}, reply NOT ME)."
+
+def identified_greeting_text(language, first_name, park_name):
+    if language == "es":
+        return f"¡Hola {first_name}! Te he identificado (si no eres {first_name}, responde NO SOY YO). ¿Cómo puedo ayudarte hoy con respecto a {park_name}?"
+    return f"Hello {first_name}! I’ve identified you (if you’re not {first_name}, reply NOT ME). How can I assist you today regarding {park_name}?"
+
+# Opening line for a conversation recognized from a phone binding, so a wrong match is easy to spot
+def recognized_text(language, first_name):
+    if language == "es":
+        return f"Hola {first_name} (si no eres {first_name}, responde NO SOY YO)."
+    return f"Hi {first_name} (if you’re not {first_name}, reply NOT ME)."
+
+def wrong_tenant_text(language):
+    if language == "es":
+        return "¡Disculpa la confusión! Ya no asociamos este número con esa cuenta. Por favor, identifícate con tu nombre, apellido o número de unidad (por ejemplo, Juan Pérez, Unidad 5)."
+    return "Sorry about the mix-up! This number is no longer linked to that account. Please identify yourself with your first name, last name, or unit number (e.g., John Doe, Unit 5)."
+
+def multiple_matches_text(language, message):
+    if language == "es":
+        return f"Encontré varios inquilinos que coinciden con '{message}'. Por favor, proporciona más detalles, como tu nombre completo o número de unidad, para identificarte."
+    return f"I found multiple tenants matching '{message}'. Please provide more details, such as your full name or unit number, to identify yourself."
+
+def no_match_text(language):
+    if language == "es":
+        return "No pude identificarte con la información proporcionada. Por favor, intenta de nuevo con tu nombre, apellido o número de unidad (por ejemplo, Juan Pérez, Unidad 5)."
+    return "I couldn’t identify you with the information provided. Please try again with your first name, last name, or unit number (e.g., John Doe, Unit 5)."
+
+def reidentify_text(language):
+    if language == "es":
+        return "Lo siento, hubo un problema al procesar tu solicitud. Por favor, identifícate nuevamente con tu nombre, apellido o número de unidad."
+    return "I’m sorry, there was an issue processing your request. Please identify yourself again with your first name, last name, or unit number."
+
+def maintenance_followup_text(language):
+    if language == "es":
+        return f" Para asistencia inmediata, puedes contactar a la oficina del parque al {PARK_OFFICE_PHONE}, disponible {PARK_OFFICE_HOURS}. ¿Hay algo más con lo que pueda ayudarte?"
+    return f" For immediate assistance, you can contact the park office at {PARK_OFFICE_PHONE}, available {PARK_OFFICE_HOURS}. Is there anything else I can assist you with?"
+
+# Templated acknowledgement for a report folded into an existing request (no LLM call needed)
+def maintenance_duplicate_text(language, maintenance_request):
+    category_name = MAINTENANCE_CATEGORY_NAMES.get(language, MAINTENANCE_CATEGORY_NAMES["en"]).get(maintenance_request["category"], maintenance_request["category"])
+    # Non-urgent requests wait for the digest, so the owner may not have heard about them yet
+    owner_aware = maintenance_request["urgent"] or maintenance_request["owner_notified_at"] is not None
+    if language == "es":
+        where = "en tu unidad" if maintenance_request["unit"] else f"en {maintenance_request['park']}"
+        status = "el dueño está informado" if owner_aware else "está en la lista del dueño para la próxima revisión de mantenimiento"
+        return f"Gracias por avisarnos. Ya tenemos un reporte del problema de {category_name} {where} (solicitud #{maintenance_request['id']}) y {status}. Te avisaremos en cuanto sepamos más."
+    where = "at your unit" if maintenance_request["unit"] else f"at {maintenance_request['park']}"
+    status = "the owner is aware" if owner_aware else "it's on the owner's list for the next maintenance review"
+    return f"Thanks for letting us know. We already have a report of the {category_name} issue {where} (request #{maintenance_request['id']}) and {status}. We'll update you as soon as we know more."
+
+# Holding reply for a message deferred under load, and the reply when even the deferred queue is full
+def holding_reply_text(language):
+    if language == "es":
+        return "¡Gracias por tu mensaje! Estamos atendiendo muchos mensajes en este momento y te responderemos en breve."
+    return "Thanks for your message! We're handling a high volume of messages right now and will reply shortly."
+
+def overloaded_text(language):
+    if language == "es":
+        return f"Estamos recibiendo una cantidad inusual de mensajes. Por favor, escríbenos de nuevo en unos minutos o llama a la oficina del parque al {PARK_OFFICE_PHONE}."
+    return f"We're receiving an unusually high number of messages. Please text us again in a few minutes or call the park office at {PARK_OFFICE_PHONE}."
+
+def goodbye_text(language):
+    if language == "es":
+        return "¡Adiós! Si necesitas más ayuda, no dudes en contactarme."
+    return "Goodbye! Feel free to reach out if you need further assistance."
+
+# Start a conversation for a new number, or record the burst on the existing one
+# Returns (is_new, bound_tenant_key) where bound_tenant_key is set when a phone binding skipped identification
+def open_conversation(from_number, messages, current_time):
+    message = " ".join(messages)
+    if from_number in CURRENT_CONVERSATIONS:
+        # Update last message time for active conversations
+        CURRENT_CONVERSATIONS[from_number]["last_message_time"] = current_time
+        for burst_message in messages:
+            record_message(from_number, "user", burst_message)
+        save_conversations()
+        return False, None
+
+    language, confidence = detect_language(message)
+    logger.info(f"Detected language: {language} (confidence {confidence:.2f}) for message: '{message}'")
+    # Numbers we already know skip identification and go straight to the tenant's query
+    bound_tenant_key = lookup_bound_tenant(from_number)
+    if bound_tenant_key:
+        logger.info(f"Recognized {from_number} as {bound_tenant_key} from phone binding")
+    with CONVERSATIONS_LOCK:
+        if not bound_tenant_key:
+            PENDING_IDENTIFICATION[from_number] = {"state": "awaiting_identification", "pending_message": message}
         CURRENT_CONVERSATIONS[from_number] = {
-            "tenant_key": None,
+            "tenant_key": bound_tenant_key,
             "last_message_time": current_time,
             "pending_end": False,
-            "pending_identification": True,
+            "pending_identification": bound_tenant_key is None,
             "language": language,
             "initial_language": language,
             "message_history": deque(maxlen=5)
         }
-        CURRENT_CONVERSATIONS[from_number]["message_history"].append({"role": "user", "content": message})
-        save_conversations()
-        if language == "es":
-            identification_prompt = "Por favor, identifícate con tu nombre, apellido o número de unidad (por ejemplo, Juan Pérez, Unidad 5)."
-        else:
-            identification_prompt = "Please identify yourself with your first name, last name, or unit number (e.g., John Doe, Unit 5)."
-        send_sms(from_number, identification_prompt)
-        CURRENT_CONVERSATIONS[from_number]["message_history"].append({"role": "bot", "content": identification_prompt})
-        save_conversations()
-        return "OK"
-
-    # Update last message time for active conversations
-    if from_number in CURRENT_CONVERSATIONS:
-        CURRENT_CONVERSATIONS[from_number]["last_message_time"] = current_time
-        CURRENT_CONVERSATIONS[from_number]["message_history"].append({"role": "user", "content": message})
+    for burst_message in messages:
+        record_message(from_number, "user", burst_message)
+    save_conversations()
+    return True, bound_tenant_key
+
+# Follow the tenant if they clearly switch languages mid-conversation; returns the conversation language
+def update_conversation_language(from_number, message):
+    conversation = CURRENT_CONVERSATIONS[from_number]
+    detected_language = detect_language_switch(message, conversation.get("language"))
+    if detected_language:
+        logger.info(f"Switching conversation language for {from_number} to {detected_language}")
+        conversation["language"] = detected_language
         save_conversations()
-
-    conversation_language = CURRENT_CONVERSATIONS[from_number].get("initial_language", "en")
-    message_history = CURRENT_CONVERSATIONS[from_number]["message_history"]
-
-    if CURRENT_CONVERSATIONS[from_number].get("pending_identification", False):
-        tenant_key, possible_matches = identify_tenant(message)
-        if tenant_key:
-            if from_number in PENDING_IDENTIFICATION:
-                del PENDING_IDENTIFICATION[from_number]
-            CURRENT_CONVERSATIONS[from_number]["tenant_key"] = tenant_key
-            CURRENT_CONVERSATIONS[from_number]["pending_identification"] = False
-            logger.info(f"Tenant identified for {from_number}: {tenant_key}")
-            save_conversations()
-            park_name = TENANTS[tenant_key]["park"]["name"]
-            if conversation_language == "es":
-                greeting = f"¡Hola {tenant_key[1]}! Te he identificado. ¿Cómo puedo ayudarte hoy con respecto a {park_name}?"
+    return conversation.get("language", conversation.get("initial_language", "en"))
+
+# Attach an identified tenant to the conversation and remember the phone number
+def complete_identification(from_number, tenant_key):
+    with CONVERSATIONS_LOCK:
+        PENDING_IDENTIFICATION.pop(from_number, None)
+    CURRENT_CONVERSATIONS[from_number]["tenant_key"] = tenant_key
+    CURRENT_CONVERSATIONS[from_number]["pending_identification"] = False
+    logger.info(f"Tenant identified for {from_number}: {tenant_key}")
+    save_conversations()
+    bind_phone_to_tenant(from_number, tenant_key[0], "identified")
+
+# Identify a conversation's tenant from a new burst; a question in the burst or in the conversation's
+# opener is returned so it's answered right after identification instead of being dropped
+def identify_pending_tenant(from_number, messages):
+    with CONVERSATIONS_LOCK:
+        opener = PENDING_IDENTIFICATION.get(from_number, {}).get("pending_message")
+    tenant_key, possible_matches, questions = identify_tenant_from_messages(messages, PARK_HINTS.get(from_number))
+    if tenant_key and opener and opener != " ".join(messages) and not is_filler_message(opener) and not is_identifying_fragment(opener, tenant_key):
+        questions = [opener] + questions
+    return tenant_key, possible_matches, questions
+
+def require_reidentification(from_number):
+    CURRENT_CONVERSATIONS[from_number]["tenant_key"] = None
+    CURRENT_CONVERSATIONS[from_number]["pending_identification"] = True
+
+# Drop a wrong match: unbind the number, stop serving that tenant's data and ask the sender to identify again
+def reset_identification(from_number):
+    reject_phone_binding(from_number)
+    with CONVERSATIONS_LOCK:
+        PENDING_IDENTIFICATION[from_number] = {"state": "awaiting_identification", "pending_message": None}
+        require_reidentification(from_number)
+    TRANSACTION_PREFETCH.cancel_for_phone(from_number)
+
+# Copy of the tenant's data with loaded financials merged in
+def tenant_data_for_query(tenant_key, message, financials=None):
+    # Work on a copy so concurrent conversations for the same tenant don't overwrite each other's data
+    tenant_data = dict(TENANTS[tenant_key])
+    if financials:
+        if financials["transactions"] is not None:
+            tenant_data["transactions"] = financials["transactions"]
+            # If the query is specifically about rent, ensure we try to infer it
+            if "rent" in message.lower() and financials["monthly_rent_charge"] is not None:
+                tenant_data["monthly_rent_charge"] = financials["monthly_rent_charge"]
+        if financials["last_payment_date"] is not None:
+            tenant_data["last_payment_date"] = financials["last_payment_date"]
+    # Precomputed figures answer most financial questions without the transaction list; when live transactions
+    # were fetched the figures come from them instead, so a payment made since the last batch is counted
+    if financials and financials["transactions"] is not None:
+        summary = summarize_tenant_financials(tenant_data, financials["transactions"], financials["last_payment_date"], datetime.date.today())
+    else:
+        summary = FINANCIAL_SUMMARIES.current(tenant_key)
+    if summary:
+        tenant_data["financial_summary"] = {
+            "monthly_rent_charge": summary["monthly_rent_charge"],
+            "days_late": summary["days_late"],
+            "accrued_late_fee": summary["accrued_late_fee"],
+            "month_to_date_charges": summary["month_to_date_charges"],
+            "month_to_date_payments": summary["month_to_date_payments"],
+            "as_of": summary["computed_at"]
+        }
+        if tenant_data.get("monthly_rent_charge") is None and summary["monthly_rent_charge"] is not None:
+            tenant_data["monthly_rent_charge"] = summary["monthly_rent_charge"]
+        if tenant_data.get("last_payment_date") is None:
+            tenant_data["last_payment_date"] = summary["last_payment_date"]
+    return tenant_data
+
+# Maintenance store settings: repeat reports of the same issue fold into one request, and only urgent issues page the owner
+MAINTENANCE_FILE = "maintenance_requests.json"
+MAINTENANCE_ARCHIVE_FILE = "maintenance_requests_archive.jsonl"  # Closed requests past MAINTENANCE_MAX_CLOSED_REQUESTS, one per line
+MAINTENANCE_MAX_CLOSED_REQUESTS = int(os.getenv("MAINTENANCE_MAX_CLOSED_REQUESTS", "500"))
+MAINTENANCE_FOLD_WINDOW_MINUTES = int(os.getenv("MAINTENANCE_FOLD_WINDOW_MINUTES", "120"))
+MAINTENANCE_DIGEST_INTERVAL_MINUTES = int(os.getenv("MAINTENANCE_DIGEST_INTERVAL_MINUTES", "60"))
+MAINTENANCE_DIGEST_MAX_ITEMS = 10
+MAINTENANCE_DIGEST_CHECK_MINUTES = 5  # How often the background job looks for a due digest
+
+# Issue categories, checked in order; the first category with a matching keyword (whole words only) wins.
+# "power" is a loss of power or an electrical hazard; any other electrical problem is "electrical".
+MAINTENANCE_CATEGORIES = [
+    ("gas", ["gas leak", "smell gas", "gas smell", "smells like gas", "gas", "fuga de gas", "olor a gas"]),
+    ("power", [
+        "power outage", "power is out", "power out", "power went out", "no power", "no electricity", "outage",
+        "no lights", "lights are out", "sparking", "sparks", "exposed wire", "exposed wires",
+        "sin luz", "se fue la luz", "apagón", "apagon", "chispas"
+    ]),
+    ("electrical", ["power", "electric", "electrical", "breaker", "outlet", "outlets", "light switch", "electricidad"]),
+    ("sewage", ["sewage", "sewer", "septic", "drenaje", "aguas negras"]),
+    ("flood", ["flood", "flooding", "flooded", "inundación", "inundacion", "inundado"]),
+    ("water", ["no water", "water main", "water pressure", "water is off", "water off", "sin agua"]),
+    ("leak", ["leak", "leaks", "leaking", "fuga", "gotera"]),
+    ("clog", ["clog", "clogged", "tapado", "tapada"])
+]
+# Outages can hit the whole park, so reports in these categories fold across units, but only on explicit outage
+# wording ("power is out", "no water") or when the tenant says it's beyond their own unit
+PARK_WIDE_MAINTENANCE_CATEGORIES = {"gas", "power", "sewage", "water"}
+PARK_WIDE_OUTAGE_PHRASES = [
+    "outage", "power is out", "power out", "power went out", "no power", "no electricity", "lights are out",
+    "no water", "water is off", "water off", "water main", "main break",
+    "whole park", "entire park", "all units", "every unit", "whole street", "everyone", "everybody", "neighbors",
+    "sin luz", "se fue la luz", "apagón", "apagon", "sin agua", "todo el parque", "vecinos"
+]
+URGENT_MAINTENANCE_CATEGORIES = {"gas", "power", "sewage", "flood", "water"}
+MAINTENANCE_CATEGORY_NAMES = {
+    "en": {"gas": "gas", "power": "power", "electrical": "electrical", "sewage": "sewage", "flood": "flooding", "water": "water", "leak": "leak", "clog": "clog", "general": "maintenance"},
+    "es": {"gas": "gas", "power": "electricidad", "electrical": "eléctrico", "sewage": "drenaje", "flood": "inundación", "water": "agua", "leak": "fuga", "clog": "obstrucción", "general": "mantenimiento"}
+}
+
+def classify_maintenance_issue(message):
+    for category, keywords in MAINTENANCE_CATEGORIES:
+        if mentions_any(message, keywords):
+            return category
+    return "general"
+
+# Park-wide only on explicit outage wording; a tenant's own gas smell or dead outlet stays with their unit
+def is_park_wide_issue(category, message):
+    return category in PARK_WIDE_MAINTENANCE_CATEGORIES and mentions_any(message, PARK_WIDE_OUTAGE_PHRASES)
+
+# Persistent, indexed maintenance requests with duplicate folding and batched owner digests
+class MaintenanceStore:
+    def __init__(self, path, archive_path, fold_window_minutes, digest_interval_minutes, max_closed):
+        self.path = path
+        self.archive_path = archive_path
+        self.fold_window = datetime.timedelta(minutes=fold_window_minutes)
+        self.digest_interval = datetime.timedelta(minutes=digest_interval_minutes)
+        self.max_closed = max_closed
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()  # Serializes file writes, which happen outside self.lock
+        self.requests = {}  # Maps request id to {"id", "status", "category", "urgent", "park", "unit", "fold_key", "opened_at", "last_reported_at", "reports": [...], "owner_notified_at", "digest_pending"}
+        self.open_ids = set()  # Ids of the open requests
+        self.open_by_fold_key = {}  # Maps fold key to the newest open request with it, the only one reports can fold into
+        self.digest_ids = set()  # Ids of the requests waiting for the next digest
+        self.closed_ids = deque()  # Closed request ids, oldest first; past max_closed they move to the archive file
+        self.archive_pending = []  # Closed requests to append to the archive file on the next write
+        self.version = 0
+        self.written_version = 0
+        self.next_id = 1
+        self.last_digest_at = None
+        self.folded_reports = 0
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                self.requests = {request_record["id"]: request_record for request_record in data.get("requests", [])}
+                self.next_id = data.get("next_id", len(self.requests) + 1)
+                self.last_digest_at = data.get("last_digest_at")
+                self.open_ids = {request_id for request_id, request_record in self.requests.items() if request_record["status"] == "open"}
+                for request_id in sorted(self.open_ids):
+                    self.open_by_fold_key[self.requests[request_id]["fold_key"]] = request_id
+                self.digest_ids = {request_id for request_id, request_record in self.requests.items() if request_record["digest_pending"]}
+                closed = [request_record for request_record in self.requests.values() if request_record["status"] != "open"]
+                self.closed_ids = deque(request_record["id"] for request_record in sorted(closed, key=lambda request_record: request_record.get("closed_at") or ""))
+                logger.info(f"Loaded {len(self.requests)} maintenance requests from file ({len(self.open_ids)} open)")
+        except Exception as e:
+            logger.error(f"Error loading maintenance requests from file: {str(e)}")
+
+    # Serialize the store for _write (call with self.lock held, then call _write after releasing it)
+    def _snapshot(self):
+        self.version += 1
+        archived, self.archive_pending = self.archive_pending, []
+        data = json.dumps({"next_id": self.next_id, "last_digest_at": self.last_digest_at, "requests": list(self.requests.values())})
+        return self.version, data, archived
+
+    # Write a snapshot outside self.lock; one that lost the race to a newer snapshot only appends its archived requests
+    def _write(self, snapshot):
+        version, data, archived = snapshot
+        with self.write_lock:
+            try:
+                if archived:
+                    with open(self.archive_path, "a") as f:
+                        for request_record in archived:
+                            f.write(json.dumps(request_record) + "\n")
+                if version <= self.written_version:
+                    return
+                temp_file = f"{self.path}.tmp"
+                with open(temp_file, "w") as f:
+                    f.write(data)
+                os.replace(temp_file, self.path)
+                self.written_version = version
+            except Exception as e:
+                logger.error(f"Error saving maintenance requests to file: {str(e)}")
+
+    # Record a tenant's report; returns (request copy, is_duplicate) where duplicates were folded into an open request
+    def report(self, from_number, tenant_key, park_name, message, now=None):
+        now = now or datetime.datetime.now()
+        category = classify_maintenance_issue(message)
+        unit = None if is_park_wide_issue(category, message) else tenant_key[3]
+        fold_key = f"{park_name.lower()}|{unit or '*'}|{category}"
+        report = {
+            "tenant_phone": from_number,
+            "tenant_id": tenant_key[0],
+            "tenant_name": f"{tenant_key[1]} {tenant_key[2]}",
+            "tenant_lot": tenant_key[3],
+            "issue": message,
+            "reported_at": now.isoformat()
+        }
+        with self.lock:
+            # An older open request outside the fold window stays open on its own until the owner closes it
+            request_record = self.requests.get(self.open_by_fold_key.get(fold_key))
+            is_duplicate = (
+                request_record is not None
+                and now - datetime.datetime.fromisoformat(request_record["last_reported_at"]) <= self.fold_window
+            )
+            if is_duplicate and any(
+                earlier["tenant_phone"] == from_number and earlier["issue"] == message for earlier in request_record["reports"]
+            ):
+                # The same tenant repeating the same report (e.g. the reply to a burst paged before it was deferred)
+                logger.info(f"Maintenance report from {from_number} is already on request #{request_record['id']}")
+            elif is_duplicate:
+                request_record["reports"].append(report)
+                request_record["last_reported_at"] = report["reported_at"]
+                # The owner hears about the extra reports in the next digest rather than another page
+                request_record["digest_pending"] = True
+                self.digest_ids.add(request_record["id"])
+                self.folded_reports += 1
+                logger.info(f"Folded maintenance report from {from_number} into request #{request_record['id']} ({len(request_record['reports'])} reports)")
             else:
-                greeting = f"Hello {tenant_key[1]}! I’ve identified you. How can I assist you today regarding {park_name}?"
-            send_sms(from_number, greeting)
-            CURRENT_CONVERSATIONS[from_number]["message_history"].append({"role": "bot", "content": greeting})
-            save_conversations()
-            return "OK"
-        else:
-            if possible_matches:
-                if conversation_language == "es":
-                    disambig_msg = f"Encontré varios inquilinos que coinciden con '{message}'. Por favor, proporciona más detalles, como tu nombre completo o número de unidad, para identificarte."
-                else:
-                    disambig_msg = f"I found multiple tenants matching '{message}'. Please provide more details, such as your full name or unit number, to identify yourself."
-                send_sms(from_number, disambig_msg)
-                CURRENT_CONVERSATIONS[from_number]["message_history"].append({"role": "bot", "content": disambig_msg})
+                request_record = {
+                    "id": self.next_id,
+                    "status": "open",
+                    "category": category,
+                    "urgent": category in URGENT_MAINTENANCE_CATEGORIES,
+                    "park": park_name,
+                    "unit": unit,
+                    "fold_key": fold_key,
+                    "opened_at": report["reported_at"],
+                    "last_reported_at": report["reported_at"],
+                    "reports": [report],
+                    "owner_notified_at": None,
+                    # Urgent requests page the owner right away; everything else waits for the digest
+                    "digest_pending": category not in URGENT_MAINTENANCE_CATEGORIES
+                }
+                self.next_id += 1
+                self.requests[request_record["id"]] = request_record
+                self.open_ids.add(request_record["id"])
+                self.open_by_fold_key[fold_key] = request_record["id"]
+                if request_record["digest_pending"]:
+                    self.digest_ids.add(request_record["id"])
+                logger.info(f"Opened maintenance request #{request_record['id']} ({category}{', urgent' if request_record['urgent'] else ''}) for {park_name}")
+            snapshot = self._snapshot()
+            result = json.loads(json.dumps(request_record))
+        self._write(snapshot)
+        return result, is_duplicate
+
+    # Record whether the owner page for an urgent request went out; a failed page falls back to the digest
+    def mark_owner_notified(self, request_id, sent):
+        with self.lock:
+            request_record = self.requests.get(request_id)
+            if not request_record:
+                return
+            if sent:
+                request_record["owner_notified_at"] = datetime.datetime.now().isoformat()
             else:
-                if conversation_language == "es":
-                    no_match_msg = "No pude identificarte con la información proporcionada. Por favor, intenta de nuevo con tu nombre, apellido o número de unidad (por ejemplo, Juan Pérez, Unidad 5)."
-                else:
-                    no_match_msg = "I couldn’t identify you with the information provided. Please try again with your first name, last name, or unit number (e.g., John Doe, Unit 5)."
-                send_sms(from_number, no_match_msg)
-                CURRENT_CONVERSATIONS[from_number]["message_history"].append({"role": "bot", "content": no_match_msg})
-            save_conversations()
-            return "OK"
+                request_record["digest_pending"] = True
+                self.digest_ids.add(request_id)
+            snapshot = self._snapshot()
+        self._write(snapshot)
+
+    # Returns the requests for the next owner digest, or None if none are pending or the last digest was too recent
+    def take_digest(self, now=None):
+        now = now or datetime.datetime.now()
+        with self.lock:
+            if self.last_digest_at and now - datetime.datetime.fromisoformat(self.last_digest_at) < self.digest_interval:
+                return None
+            if not self.digest_ids:
+                return None
+            pending = [self.requests[request_id] for request_id in sorted(self.digest_ids)]
+            self.digest_ids = set()
+            for request_record in pending:
+                request_record["digest_pending"] = False
+                request_record["owner_notified_at"] = now.isoformat()
+            self.last_digest_at = now.isoformat()
+            snapshot = self._snapshot()
+            result = json.loads(json.dumps(pending))
+        self._write(snapshot)
+        return result
+
+    # Put requests back in the digest queue after a digest failed to send
+    def requeue_digest(self, request_ids):
+        with self.lock:
+            for request_id in request_ids:
+                if request_id in self.requests:
+                    self.requests[request_id]["digest_pending"] = True
+                    self.digest_ids.add(request_id)
+            self.last_digest_at = None
+            snapshot = self._snapshot()
+        self._write(snapshot)
+
+    def close(self, request_id):
+        with self.lock:
+            request_record = self.requests.get(request_id)
+            if not request_record:
+                return None
+            if request_record["status"] == "open":
+                request_record["status"] = "closed"
+                request_record["closed_at"] = datetime.datetime.now().isoformat()
+                self.open_ids.discard(request_id)
+                if self.open_by_fold_key.get(request_record["fold_key"]) == request_id:
+                    del self.open_by_fold_key[request_record["fold_key"]]
+                self.closed_ids.append(request_id)
+                # Keep the live file to the open requests plus the most recent closed ones
+                while len(self.closed_ids) > self.max_closed:
+                    archived_id = self.closed_ids.popleft()
+                    self.archive_pending.append(self.requests.pop(archived_id))
+                    self.digest_ids.discard(archived_id)
+            snapshot = self._snapshot()
+            result = json.loads(json.dumps(request_record))
+        self._write(snapshot)
+        return result
+
+    def query(self, status=None, park=None, category=None, urgent=None):
+        with self.lock:
+            matches = [
+                request_record for request_record in self.requests.values()
+                if (status is None or request_record["status"] == status)
+                and (park is None or request_record["park"].lower() == park.lower())
+                and (category is None or request_record["category"] == category)
+                and (urgent is None or request_record["urgent"] == urgent)
+            ]
+            return json.loads(json.dumps(matches))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": len(self.requests),
+                "open": len(self.open_ids),
+                "digest_pending": len(self.digest_ids),
+                "folded_reports": self.folded_reports,
+                "last_digest_at": self.last_digest_at
+            }
 
-    # Handle tenant's query
+MAINTENANCE_STORE = MaintenanceStore(MAINTENANCE_FILE, MAINTENANCE_ARCHIVE_FILE, MAINTENANCE_FOLD_WINDOW_MINUTES, MAINTENANCE_DIGEST_INTERVAL_MINUTES, MAINTENANCE_MAX_CLOSED_REQUESTS)
+MAINTENANCE_STORE.load()
+
+# Record a maintenance request; returns (request, is_duplicate, owner_message) where owner_message is set when the owner should be paged now
+def log_maintenance_request(from_number, tenant_key, message):
+    park_name = TENANTS.get(tenant_key, {}).get("park", {}).get("name", "Unknown Park")
+    maintenance_request, is_duplicate = MAINTENANCE_STORE.report(from_number, tenant_key, park_name, message)
+    owner_message = None
+    if maintenance_request["urgent"] and not is_duplicate:
+        owner_message = f"URGENT maintenance request #{maintenance_request['id']} from {tenant_key[1]} {tenant_key[2]}, Unit {tenant_key[3]} at {park_name}: {message}"
+    return maintenance_request, is_duplicate, owner_message
+
+# Owner digest text for a batch of maintenance requests
+def maintenance_digest_text(maintenance_requests):
+    lines = [f"Maintenance digest: {len(maintenance_requests)} request(s)"]
+    for maintenance_request in maintenance_requests[:MAINTENANCE_DIGEST_MAX_ITEMS]:
+        where = f"Unit {maintenance_request['unit']}" if maintenance_request["unit"] else "park-wide"
+        report_count = len(maintenance_request["reports"])
+        lines.append(
+            f"#{maintenance_request['id']} {maintenance_request['park']} {where} ({maintenance_request['category']}"
+            f"{', urgent' if maintenance_request['urgent'] else ''}, {report_count} report{'s' if report_count != 1 else ''}): "
+            f"{maintenance_request['reports'][0]['issue']}"
+        )
+    if len(maintenance_requests) > MAINTENANCE_DIGEST_MAX_ITEMS:
+        lines.append(f"...and {len(maintenance_requests) - MAINTENANCE_DIGEST_MAX_ITEMS} more (see /maintenance_requests)")
+    return "\n".join(lines)
+
+# Send the owner any batched maintenance requests; returns the number of requests included
+def send_maintenance_digest():
+    maintenance_requests = MAINTENANCE_STORE.take_digest()
+    if not maintenance_requests:
+        return 0
+    try:
+        send_sms(OWNER_PHONE, maintenance_digest_text(maintenance_requests))
+    except Exception as e:
+        logger.error(f"Failed to send maintenance digest: {str(e)}")
+        MAINTENANCE_STORE.requeue_digest([maintenance_request["id"] for maintenance_request in maintenance_requests])
+        return 0
+    logger.info(f"Sent maintenance digest with {len(maintenance_requests)} requests")
+    return len(maintenance_requests)
+
+# Record whether the owner page for a maintenance request went out (error is the send failure, if any)
+def note_owner_page(maintenance_request, tenant_key, error=None):
+    if error is not None:
+        logger.error(f"Failed to notify owner for maintenance request from {tenant_key[1]} {tenant_key[2]}: {str(error)}")
+    MAINTENANCE_STORE.mark_owner_notified(maintenance_request["id"], sent=error is None)
+
+# Tenant data for the maintenance reply, saying whether the owner is paged now or hears about it in the digest
+def maintenance_tenant_data(tenant_data, maintenance_request):
+    return dict(tenant_data, maintenance_request={
+        "id": maintenance_request["id"],
+        "category": maintenance_request["category"],
+        "owner_notification": "paged now" if maintenance_request["urgent"] else "next maintenance digest"
+    })
+
+# Log a maintenance report, page the owner if it's urgent and return the tenant's reply
+def maintenance_reply(from_number, tenant_key, message, tenant_data, conversation_language, message_history, voice=False):
+    maintenance_request, is_duplicate, owner_message = log_maintenance_request(from_number, tenant_key, message)
+    if owner_message:
+        error = None
+        try:
+            send_sms(OWNER_PHONE, owner_message)
+        except Exception as e:
+            error = e
+        note_owner_page(maintenance_request, tenant_key, error)
+    if is_duplicate:
+        return maintenance_duplicate_text(conversation_language, maintenance_request)
+    tenant_data = maintenance_tenant_data(tenant_data, maintenance_request)
+    return get_ai_response(message, tenant_data, conversation_language, message_history, is_maintenance_request=True, include_transactions=False, voice=voice)
+
+# The steps before a tenant's question is answered, shared by process_sms and process_sms_async.
+# Returns (notice, message, reply_prefix): notice is a text that answers the burst on its own (an identification
+# prompt or retry, a greeting, or a wrong-match reset); otherwise message is the question to answer and reply_prefix
+# opens the answer. start_prefetch(tenant_id, phone_number) is called as soon as the tenant is known.
+def prepare_reply(from_number, messages, start_prefetch):
+    current_time = datetime.datetime.now()
+    message = " ".join(messages)
+    if len(messages) > 1:
+        logger.info(f"Processing {len(messages)} coalesced messages from {from_number} as: '{message}'")
+
+    is_new, bound_tenant_key = open_conversation(from_number, messages, current_time)
+    if bound_tenant_key:
+        start_prefetch(bound_tenant_key[0], from_number)
+    # A burst usually already carries the tenant's name or unit, so only prompt for a lone opener
+    if is_new and len(messages) == 1 and not bound_tenant_key:
+        return identification_prompt_text(CURRENT_CONVERSATIONS[from_number]["language"]), None, ""
+
+    conversation_language = update_conversation_language(from_number, message)
+    if CURRENT_CONVERSATIONS[from_number]["tenant_key"] and is_not_me_message(message):
+        reset_identification(from_number)
+        return wrong_tenant_text(conversation_language), None, ""
+    if not CURRENT_CONVERSATIONS[from_number].get("pending_identification", False):
+        return None, message, recognized_text(conversation_language, bound_tenant_key[1]) + " " if is_new and bound_tenant_key else ""
+
+    tenant_key, possible_matches, questions = identify_pending_tenant(from_number, messages)
+    if not tenant_key:
+        return multiple_matches_text(conversation_language, message) if possible_matches else no_match_text(conversation_language), None, ""
+    complete_identification(from_number, tenant_key)
+    start_prefetch(tenant_key[0], from_number)
+    if not questions:
+        return identified_greeting_text(conversation_language, tenant_key[1], TENANTS[tenant_key]["park"]["name"]), None, ""
+    # The burst also asked something: answer it now
+    return None, " ".join(questions), identified_text(conversation_language, tenant_key[1]) + " "
+
+# The conversation's tenant and a check that it's usable; raises when it isn't
+def conversation_tenant_key(from_number):
     tenant_key = CURRENT_CONVERSATIONS[from_number]["tenant_key"]
-    # Validate tenant_key type
     if not isinstance(tenant_key, tuple):
-        logger.error(f"Invalid tenant_key type for {from_number}: {type(tenant_key)}. Expected tuple, got {tenant_key}")
-        if conversation_language == "es":
-            error_msg = "Lo siento, hubo un problema al procesar tu solicitud. Por favor, identifícate nuevamente con tu nombre, apellido o número de unidad."
-        else:
-            error_msg = "I’m sorry, there was an issue processing your request. Please identify yourself again with your first name, last name, or unit number."
-        send_sms(from_number, error_msg)
-        CURRENT_CONVERSATIONS[from_number]["message_history"].append({"role": "bot", "content": error_msg})
-        CURRENT_CONVERSATIONS[from_number]["tenant_key"] = None
-        CURRENT_CONVERSATIONS[from_number]["pending_identification"] = True
+        raise TypeError(f"Invalid tenant_key type: {type(tenant_key)}. Expected tuple, got {tenant_key}")
+    return tenant_key
+
+# The tenant's data couldn't be loaded (e.g. they left the roster): returns the text asking them to identify again
+def tenant_data_error_text(from_number, error):
+    logger.error(f"Error accessing tenant data for {from_number} with tenant_key {CURRENT_CONVERSATIONS[from_number]['tenant_key']}: {str(error)}")
+    require_reidentification(from_number)
+    return reidentify_text(message_language(from_number, []))
+
+# Process one inbound tenant message, or several coalesced from a burst, as a single input
+def process_sms(from_number, messages):
+    notice, message, reply_prefix = prepare_reply(from_number, messages, TRANSACTION_PREFETCH.start)
+    if notice:
+        send_sms(from_number, notice)
+        record_message(from_number, "bot", notice)
         save_conversations()
         return "OK"
 
+    conversation_language = message_language(from_number, messages)
+    message_history = CURRENT_CONVERSATIONS[from_number]["message_history"]
     try:
-        tenant_data = TENANTS[tenant_key]
+        tenant_key = conversation_tenant_key(from_number)
         # Fetch transactions for financial queries (balance, statement, rent, etc.)
-        if any(keyword in message.lower() for keyword in ["balance", "pay", "due", "payment history", "last payment", "recent transactions", "last month", "rent charge", "statement", "charge for", "rent"]):
-            transactions, last_payment_date = fetch_tenant_transactions(tenant_key[0])
-            if transactions is not None:
-                tenant_data["transactions"] = transactions
-                # If the query is specifically about rent, ensure we try to infer it
-                if "rent" in message.lower():
-                    monthly_rent_charge = None
-                    for transaction in transactions:
-                        if "rent" in transaction.get("Comment", "").lower() and transaction.get("TransactionType") != "Payment":
-                            monthly_rent_charge = float(transaction.get("Amount", 0.00))
-                            break
-                    if monthly_rent_charge is not None:
-                        tenant_data["monthly_rent_charge"] = monthly_rent_charge
-            if last_payment_date is not None:
-                tenant_data["last_payment_date"] = last_payment_date
+        financials = TRANSACTION_PREFETCH.get(tenant_key[0], fresh=is_payment_question(message)) if needs_transactions(tenant_key, message) else None
+        tenant_data = tenant_data_for_query(tenant_key, message, financials)
     except Exception as e:
-        logger.error(f"Error accessing tenant data for {from_number} with tenant_key {tenant_key}: {str(e)}")
-        if conversation_language == "es":
-            error_msg = "Lo siento, hubo un problema al procesar tu solicitud. Por favor, identifícate nuevamente con tu nombre, apellido o número de unidad."
-        else:
-            error_msg = "I’m sorry, there was an issue processing your request. Please identify yourself again with your first name, last name, or unit number."
+        error_msg = tenant_data_error_text(from_number, e)
         send_sms(from_number, error_msg)
-        CURRENT_CONVERSATIONS[from_number]["message_history"].append({"role": "bot", "content": error_msg})
-        CURRENT_CONVERSATIONS[from_number]["tenant_key"] = None
-        CURRENT_CONVERSATIONS[from_number]["pending_identification"] = True
+        record_message(from_number, "bot", error_msg)
         save_conversations()
         return "OK"
 
-    message_lower = message.lower()
+    if is_maintenance_request(message):
+        reply = maintenance_reply(from_number, tenant_key, message, tenant_data, conversation_language, message_history)
+        reply += maintenance_followup_text(conversation_language)
+    else:
+        reply = get_ai_response(message, tenant_data, conversation_language, message_history, include_transactions=True)
+    reply = reply_prefix + reply
+    send_sms(from_number, reply)
+    record_message(from_number, "bot", reply)
 
-    if "maintenance" in message_lower or "fix" in message_lower or "broken" in message_lower or "leak" in message_lower or "leaking" in message_lower or "flood" in message_lower or "damage" in message_lower or "repair" in message_lower or "clog" in message_lower or "power" in message_lower:
-        tenant_name = f"{tenant_key[1]} {tenant_key[2]}"
-        tenant_lot = tenant_key[3]
-        MAINTENANCE_REQUESTS.append({
-            "tenant_phone": from_number,
-            "tenant_name": tenant_name,
-            "tenant_lot": tenant_lot,
-            "issue": message
-        })
-        owner_message = f"Maintenance request from {tenant_name}, Unit {tenant_lot}: {message}"
+    # Check if the tenant intends to end the conversation
+    intent = get_ai_response(message, tenant_data, conversation_language, message_history, check_for_end=True, include_transactions=False)
+    if "END_CONVERSATION" in intent:
+        goodbye_msg = goodbye_text(conversation_language)
+        send_sms(from_number, goodbye_msg)
+        record_message(from_number, "bot", goodbye_msg)
+        end_conversation(from_number)
+        logger.info(f"Conversation ended for {from_number} based on AI intent detection")
+    save_conversations()
+    return "OK"
+
+# Log an urgent maintenance report and page the owner before its burst is deferred or shed, so overload never
+# delays the page. The tenant's reply comes later and folds into the same request without a second page.
+def page_urgent_maintenance_now(from_number, messages, tenant_key=None):
+    if tenant_key is None:
+        conversation = CURRENT_CONVERSATIONS.get(from_number) or {}
+        tenant_key = conversation.get("tenant_key") if isinstance(conversation.get("tenant_key"), tuple) else lookup_bound_tenant(from_number)
+    if tenant_key is None:
+        tenant_key = (None, "Unidentified", "tenant", f"unknown ({from_number})")
+    try:
+        maintenance_request, _, owner_message = log_maintenance_request(from_number, tenant_key, " ".join(messages))
+    except Exception as e:
+        logger.error(f"Failed to log urgent maintenance request from {from_number} before deferring it: {str(e)}")
+        return
+    logger.warning(f"Logged urgent maintenance request #{maintenance_request['id']} from {from_number} ahead of a deferred reply")
+    if owner_message:
+        error = None
         try:
             send_sms(OWNER_PHONE, owner_message)
         except Exception as e:
-            logger.error(f"Failed to notify owner for maintenance request from {tenant_name}: {str(e)}")
-        reply = get_ai_response(message, tenant_data, conversation_language, message_history, is_maintenance_request=True, include_transactions=False)
-        if conversation_language == "es":
-            reply += f" Para asistencia inmediata, puedes contactar a la oficina del parque al {PARK_OFFICE_PHONE}, disponible {PARK_OFFICE_HOURS}. ¿Hay algo más con lo que pueda ayudarte?"
+            error = e
+        note_owner_page(maintenance_request, tenant_key, error)
+
+# Process a burst once the admission controller grants a slot; under overload it's deferred behind a holding reply
+def admit_and_process(from_number, messages):
+    priority = message_priority(" ".join(messages))
+    # Once a tenant has a deferred message, later ones queue behind it so they're answered in order
+    if not ADMISSION.has_deferred(from_number) and ADMISSION.acquire(priority, ADMISSION_MAX_WAIT_SECONDS[priority]):
+        try:
+            with PHONE_LOCKS.hold(from_number):
+                return process_sms(from_number, messages)
+        finally:
+            ADMISSION.release()
+    if priority == "emergency":
+        page_urgent_maintenance_now(from_number, messages)
+    logger.warning(f"Deferring {priority} message from {from_number} under load")
+    deferred = ADMISSION.defer(from_number, messages, priority)
+    if deferred == "first":
+        send_holding_reply(from_number, messages)
+        schedule_deferred(from_number)
+    elif deferred is None:
+        logger.error(f"Dropping message from {from_number}: deferred queue is full")
+        send_sms(from_number, overloaded_text(message_language(from_number, messages)))
+    return "OK"
+
+def message_language(from_number, messages):
+    conversation = CURRENT_CONVERSATIONS.get(from_number)
+    if conversation:
+        return conversation.get("language", conversation.get("initial_language", "en"))
+    return detect_language(" ".join(messages))[0]
+
+def send_holding_reply(from_number, messages):
+    try:
+        send_sms(from_number, holding_reply_text(message_language(from_number, messages)))
+    except Exception as e:
+        logger.error(f"Failed to send holding reply to {from_number}: {str(e)}")
+
+# Queue the phone's oldest deferred burst for a slot in its own priority class; it only takes a worker once admitted,
+# so a deferred emergency is never stuck behind deferred normal traffic
+def schedule_deferred(from_number):
+    while True:
+        deferred = ADMISSION.next_deferred(from_number)
+        if deferred is None:
+            return
+        messages, priority = deferred
+        if ADMISSION.submit(priority, lambda: DEFERRED_MESSAGES.submit(process_deferred, from_number, messages), deferred=True):
+            return
+        logger.error(f"Dropping deferred {priority} message from {from_number}: deferred queue is full")
+        try:
+            send_sms(from_number, overloaded_text(message_language(from_number, messages)))
+        except Exception as e:
+            logger.error(f"Failed to send overload notice to {from_number}: {str(e)}")
+        ADMISSION.finish_deferred(from_number)
+
+# Answer an admitted deferred burst, then queue the phone's next one so its messages are answered in order
+def process_deferred(from_number, messages):
+    try:
+        with PHONE_LOCKS.hold(from_number):
+            process_sms(from_number, messages)
+    except Exception as e:
+        logger.error(f"Error processing deferred message from {from_number}: {str(e)}")
+    finally:
+        ADMISSION.release()
+        ADMISSION.finish_deferred(from_number)
+    schedule_deferred(from_number)
+
+# Voice settings: each caller turn is answered in the background while the call hears short filler prompts
+VOICE_ANSWER_WAIT_SECONDS = float(os.getenv("VOICE_ANSWER_WAIT_SECONDS", "3.5"))  # How long one /voice/answer poll waits before a filler
+VOICE_MAX_ANSWER_SECONDS = float(os.getenv("VOICE_MAX_ANSWER_SECONDS", "25"))
+VOICE_MAX_RESPONSE_CHARS = int(os.getenv("VOICE_MAX_RESPONSE_CHARS", "320"))
+VOICE_MAX_TOKENS = int(os.getenv("VOICE_MAX_TOKENS", "120"))
+VOICE_MAX_IDENTIFY_ATTEMPTS = int(os.getenv("VOICE_MAX_IDENTIFY_ATTEMPTS", "2"))
+VOICE_MAX_WORKERS = int(os.getenv("VOICE_MAX_WORKERS", "8"))
+CALL_LOGS_FILE = "call_logs.json"
+CALL_LOGS_MAX_ENTRIES = int(os.getenv("CALL_LOGS_MAX_ENTRIES", "1000"))
+VOICE_LANGUAGES = {"en": "en-US", "es": "es-MX"}
+VOICE_GOODBYE_PHRASES = ["goodbye", "bye", "that's all", "that is all", "no thanks", "no thank you", "nothing else", "i'm done",
+                         "adiós", "adios", "eso es todo", "nada más", "nada mas", "no gracias"]
+VOICE_SPANISH_REQUESTS = ["español", "espanol", "spanish"]
+
+VOICE_CALLS = {}  # Maps CallSid to {"from_number", "tenant_key", "language", "message_history": deque, "identify_attempts", "pending": {...} or None, "log": dict}
+VOICE_CALLS_LOCK = threading.Lock()  # Guards VOICE_CALLS; webhooks for different calls arrive on concurrent threads
+VOICE_ANSWERS = ThreadPoolExecutor(max_workers=VOICE_MAX_WORKERS, thread_name_prefix="voice-answers")
+CALL_LOGS_LOCK = threading.Lock()  # Guards CALL_LOGS and the call log dicts in it
+
+def load_call_logs():
+    global CALL_LOGS
+    try:
+        if os.path.exists(CALL_LOGS_FILE):
+            with open(CALL_LOGS_FILE, "r") as f:
+                CALL_LOGS = json.load(f)
+            logger.info(f"Loaded {len(CALL_LOGS)} call logs from file")
+    except Exception as e:
+        logger.error(f"Error loading call logs from file: {str(e)}")
+        CALL_LOGS = []
+
+def save_call_logs():
+    try:
+        with CALL_LOGS_LOCK:
+            del CALL_LOGS[:-CALL_LOGS_MAX_ENTRIES]
+            temp_file = f"{CALL_LOGS_FILE}.tmp"
+            with open(temp_file, "w") as f:
+                json.dump(CALL_LOGS, f)
+            os.replace(temp_file, CALL_LOGS_FILE)
+    except Exception as e:
+        logger.error(f"Error saving call logs to file: {str(e)}")
+
+load_call_logs()
+
+def voice_welcome_text(language):
+    if language == "es":
+        return "Bienvenido a ParkBot. Para comenzar, por favor diga su nombre completo y su número de lote."
+    return "Welcome to ParkBot. To get started, please say your full name and lot number. Para español, diga español."
+
+def voice_greeting_text(language, first_name, park_name):
+    if language == "es":
+        return f"Hola {first_name}, gracias por llamar a {park_name}. Si no es {first_name}, diga no soy yo. ¿En qué puedo ayudarle hoy?"
+    return f"Hi {first_name}, thanks for calling {park_name}. If you're not {first_name}, say not me. How can I help you today? Para español, diga español."
+
+def voice_retry_identify_text(language):
+    if language == "es":
+        return "Lo siento, no encontré su cuenta. Por favor, diga de nuevo su nombre completo y su número de lote."
+    return "Sorry, I couldn't find your account. Please say your full name and lot number again."
+
+def voice_identify_failed_text(language):
+    if language == "es":
+        return f"Lo siento, todavía no encuentro su cuenta. Por favor, envíenos un mensaje de texto o llame a la oficina del parque al {PARK_OFFICE_PHONE}, disponible {PARK_OFFICE_HOURS}. Adiós."
+    return f"I'm sorry, I still couldn't find your account. Please text us or call the park office at {PARK_OFFICE_PHONE}, available {PARK_OFFICE_HOURS}. Goodbye."
+
+def voice_anything_else_text(language):
+    if language == "es":
+        return "¿Hay algo más en lo que pueda ayudarle?"
+    return "Is there anything else I can help you with?"
+
+# Short prompts played while an answer is being prepared, in order
+def voice_filler_texts(language):
+    if language == "es":
+        return ["Un momento mientras lo reviso.", "Sigo buscando, gracias por su paciencia.", "Ya casi."]
+    return ["One moment while I check that for you.", "Still looking that up, thanks for your patience.", "Almost there."]
+
+def voice_timeout_text(language):
+    if language == "es":
+        return f"Lo siento, esto está tardando más de lo esperado. Por favor, intente de nuevo más tarde o llame a la oficina del parque al {PARK_OFFICE_PHONE}."
+    return f"I'm sorry, that's taking longer than expected. Please try again later or call the park office at {PARK_OFFICE_PHONE}."
+
+def voice_goodbye_text(language):
+    if language == "es":
+        return "Gracias por llamar. ¡Adiós!"
+    return "Thank you for calling. Goodbye!"
+
+def voice_no_input_text(language):
+    if language == "es":
+        return "No escuché nada. Si necesita algo más, llámenos de nuevo. Adiós."
+    return "I didn't hear anything. If you need anything else, please call back. Goodbye."
+
+# Trim a reply to something quick to say: plain text, capped at a sentence boundary where possible
+def cap_voice_reply(reply):
+    reply = " ".join(re.sub(r"[*#_`]", "", reply).split())
+    if len(reply) <= VOICE_MAX_RESPONSE_CHARS:
+        return reply, False
+    cut = reply[:VOICE_MAX_RESPONSE_CHARS]
+    sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    if sentence_end > VOICE_MAX_RESPONSE_CHARS // 3:
+        return cut[:sentence_end + 1], True
+    return cut[:cut.rfind(" ")].rstrip(",;:") + "...", True
+
+def twiml(response):
+    return str(response), 200, {"Content-Type": "text/xml"}
+
+# Listen for the caller's next utterance; if they say nothing the call ends politely
+def gather_speech(response, action, prompt, language):
+    gather = response.gather(input="speech", action=action, method="POST", speech_timeout="auto", language=VOICE_LANGUAGES[language])
+    gather.say(prompt, language=VOICE_LANGUAGES[language])
+    response.say(voice_no_input_text(language), language=VOICE_LANGUAGES[language])
+    response.hangup()
+    return response
+
+# Switch the call to Spanish if the caller asks for it or clearly speaks it; returns True if the language changed
+def update_call_language(call, speech):
+    speech_lower = speech.lower()
+    if call["language"] != "es" and any(request_word in speech_lower for request_word in VOICE_SPANISH_REQUESTS):
+        call["language"] = "es"
+        return True
+    language = detect_language_switch(speech, call["language"])
+    if language:
+        call["language"] = language
+    return False
+
+def start_call_turn(call, question):
+    call["message_history"].append({"role": "user", "content": question})
+    call["pending"] = {
+        "question": question,
+        "future": VOICE_ANSWERS.submit(answer_voice_question, call, question),
+        "started_at": time.monotonic(),
+        "fillers": 1
+    }
+
+# Build the reply for one caller question; runs on the voice worker pool
+def answer_voice_question(call, question):
+    language = call["language"]
+    tenant_key = call["tenant_key"]
+    priority = message_priority(question)
+    if not ADMISSION.acquire(priority, VOICE_MAX_ANSWER_SECONDS):
+        if priority == "emergency":
+            page_urgent_maintenance_now(call["from_number"], [question], tenant_key)
+        return voice_timeout_text(language)
+    try:
+        financials = TRANSACTION_PREFETCH.get(tenant_key[0], fresh=is_payment_question(question)) if needs_transactions(tenant_key, question) else None
+        tenant_data = tenant_data_for_query(tenant_key, question, financials)
+        message_history = list(call["message_history"])
+        if is_maintenance_request(question):
+            return maintenance_reply(call["from_number"], tenant_key, question, tenant_data, language, message_history, voice=True)
+        return get_ai_response(question, tenant_data, language, message_history, include_transactions=True, voice=True)
+    except Exception as e:
+        logger.error(f"Error answering voice question for {call['from_number']}: {str(e)}")
+        return fallback_ai_response(question, TENANTS.get(tenant_key, {"balance": "unknown", "due_date": "unknown"}), language)
+    finally:
+        ADMISSION.release()
+
+def get_voice_call(call_sid):
+    with VOICE_CALLS_LOCK:
+        return VOICE_CALLS.get(call_sid)
+
+# Drop calls whose status callback never arrived and persist their logs as abandoned
+def forget_stale_calls():
+    cutoff = (datetime.datetime.now() - datetime.timedelta(hours=2)).isoformat()
+    with VOICE_CALLS_LOCK:
+        stale = [call_sid for call_sid, call in VOICE_CALLS.items() if call["log"]["started_at"] < cutoff]
+        stale_calls = [VOICE_CALLS.pop(call_sid) for call_sid in stale]
+    if not stale_calls:
+        return
+    with CALL_LOGS_LOCK:
+        for call in stale_calls:
+            call["log"]["status"] = "abandoned"
+    for call in stale_calls:
+        if call["pending"]:
+            call["pending"]["future"].cancel()
+    save_call_logs()
+    logger.info(f"Forgot {len(stale_calls)} voice calls whose status callback never arrived")
+
+# Incoming call: identify the caller from caller ID when we can, otherwise ask for their name and lot
+@app.route("/voice", methods=["POST"])
+def voice_call():
+    call_sid = request.values.get("CallSid")
+    from_number = request.values.get("From")
+    logger.info(f"Incoming call {call_sid} from {from_number}")
+    forget_stale_calls()
+    note_messaging_number(from_number, request.values.get("To"))
+
+    tenant_key = lookup_bound_tenant(from_number)
+    conversation = CURRENT_CONVERSATIONS.get(from_number)
+    language = conversation.get("language", "en") if conversation else "en"
+    call = {
+        "from_number": from_number,
+        "tenant_key": tenant_key,
+        "language": language,
+        "message_history": deque(maxlen=5),
+        "identify_attempts": 0,
+        "pending": None,
+        "log": {
+            "call_sid": call_sid,
+            "from_number": from_number,
+            "tenant_id": tenant_key[0] if tenant_key else None,
+            "identified_by": "caller_id" if tenant_key else None,
+            "started_at": datetime.datetime.now().isoformat(),
+            "ended_at": None,
+            "status": "in-progress",
+            "turns": []
+        }
+    }
+    with VOICE_CALLS_LOCK:
+        VOICE_CALLS[call_sid] = call
+    with CALL_LOGS_LOCK:
+        CALL_LOGS.append(call["log"])
+    save_call_logs()
+
+    response = VoiceResponse()
+    if tenant_key:
+        logger.info(f"Recognized caller {from_number} as {tenant_key} from caller ID")
+        # Warm the tenant's transactions while they're still talking
+        TRANSACTION_PREFETCH.start(tenant_key[0], from_number)
+        return twiml(gather_speech(response, "/voice/respond", voice_greeting_text(language, tenant_key[1], TENANTS[tenant_key]["park"]["name"]), language))
+    return twiml(gather_speech(response, "/voice/identify", voice_welcome_text(language), language))
+
+@app.route("/voice/identify", methods=["POST"])
+def voice_identify():
+    call = get_voice_call(request.values.get("CallSid"))
+    response = VoiceResponse()
+    if not call:
+        response.hangup()
+        return twiml(response)
+    speech = request.values.get("SpeechResult", "").strip()
+    if update_call_language(call, speech):
+        return twiml(gather_speech(response, "/voice/identify", voice_welcome_text(call["language"]), call["language"]))
+
+    tenant_key, _ = identify_tenant(speech, PARK_HINTS.get(call["from_number"])) if speech and not is_filler_message(speech) else (None, None)
+    if tenant_key:
+        call["tenant_key"] = tenant_key
+        with CALL_LOGS_LOCK:
+            call["log"]["tenant_id"] = tenant_key[0]
+            call["log"]["identified_by"] = "speech"
+        bind_phone_to_tenant(call["from_number"], tenant_key[0], "identified")
+        TRANSACTION_PREFETCH.start(tenant_key[0], call["from_number"])
+        save_call_logs()
+        return twiml(gather_speech(response, "/voice/respond", voice_greeting_text(call["language"], tenant_key[1], TENANTS[tenant_key]["park"]["name"]), call["language"]))
+
+    call["identify_attempts"] += 1
+    if call["identify_attempts"] >= VOICE_MAX_IDENTIFY_ATTEMPTS:
+        response.say(voice_identify_failed_text(call["language"]), language=VOICE_LANGUAGES[call["language"]])
+        response.hangup()
+        return twiml(response)
+    return twiml(gather_speech(response, "/voice/identify", voice_retry_identify_text(call["language"]), call["language"]))
+
+# A question from an identified caller: start answering it and keep the line alive with a filler prompt
+@app.route("/voice/respond", methods=["POST"])
+def voice_respond():
+    call = get_voice_call(request.values.get("CallSid"))
+    response = VoiceResponse()
+    if not call or not call["tenant_key"]:
+        response.hangup()
+        return twiml(response)
+    speech = request.values.get("SpeechResult", "").strip()
+    if update_call_language(call, speech):
+        return twiml(gather_speech(response, "/voice/respond", voice_anything_else_text(call["language"]), call["language"]))
+    if not speech:
+        return twiml(gather_speech(response, "/voice/respond", voice_anything_else_text(call["language"]), call["language"]))
+    if is_not_me_message(speech):
+        logger.info(f"Caller {call['from_number']} on {request.values.get('CallSid')} says they aren't {call['tenant_key']}")
+        reject_phone_binding(call["from_number"])
+        TRANSACTION_PREFETCH.cancel_for_phone(call["from_number"])
+        call["tenant_key"] = None
+        with CALL_LOGS_LOCK:
+            call["log"]["tenant_id"] = None
+            call["log"]["identified_by"] = None
+        call["identify_attempts"] = 0
+        save_call_logs()
+        return twiml(gather_speech(response, "/voice/identify", voice_welcome_text(call["language"]), call["language"]))
+    if speech.lower().strip(" .!") == "no" or mentions_any(speech, VOICE_GOODBYE_PHRASES):
+        response.say(voice_goodbye_text(call["language"]), language=VOICE_LANGUAGES[call["language"]])
+        response.hangup()
+        return twiml(response)
+
+    start_call_turn(call, speech)
+    response.say(voice_filler_texts(call["language"])[0], language=VOICE_LANGUAGES[call["language"]])
+    response.redirect("/voice/answer", method="POST")
+    return twiml(response)
+
+# Poll for the pending answer; Twilio redirects here after each filler prompt
+@app.route("/voice/answer", methods=["POST"])
+def voice_answer():
+    call = get_voice_call(request.values.get("CallSid"))
+    response = VoiceResponse()
+    if not call or not call["pending"]:
+        response.hangup()
+        return twiml(response)
+    pending = call["pending"]
+    language = call["language"]
+    remaining = VOICE_MAX_ANSWER_SECONDS - (time.monotonic() - pending["started_at"])
+    try:
+        reply = pending["future"].result(timeout=max(0.0, min(VOICE_ANSWER_WAIT_SECONDS, remaining)))
+    except Exception:
+        if remaining > VOICE_ANSWER_WAIT_SECONDS and not pending["future"].done():
+            fillers = voice_filler_texts(language)
+            response.say(fillers[min(pending["fillers"], len(fillers) - 1)], language=VOICE_LANGUAGES[language])
+            pending["fillers"] += 1
+            response.redirect("/voice/answer", method="POST")
+            return twiml(response)
+        logger.error(f"Voice answer for call {request.values.get('CallSid')} didn't finish in {VOICE_MAX_ANSWER_SECONDS}s")
+        reply = voice_timeout_text(language)
+
+    reply, truncated = cap_voice_reply(reply)
+    call["message_history"].append({"role": "bot", "content": reply})
+    call["pending"] = None
+    turn = {
+        "question": pending["question"],
+        "priority": message_priority(pending["question"]),
+        "answer_ms": round(1000 * (time.monotonic() - pending["started_at"])),
+        "fillers": pending["fillers"],
+        "answer_chars": len(reply),
+        "truncated": truncated
+    }
+    with CALL_LOGS_LOCK:
+        call["log"]["turns"].append(turn)
+    save_call_logs()
+    response.say(reply, language=VOICE_LANGUAGES[language])
+    return twiml(gather_speech(response, "/voice/respond", voice_anything_else_text(language), language))
+
+# Twilio call status callback: close out the call log
+@app.route("/voice/status", methods=["POST"])
+def voice_status():
+    call_sid = request.values.get("CallSid")
+    with VOICE_CALLS_LOCK:
+        call = VOICE_CALLS.pop(call_sid, None)
+    if call:
+        duration = request.values.get("CallDuration")
+        with CALL_LOGS_LOCK:
+            call["log"]["status"] = request.values.get("CallStatus", "completed")
+            call["log"]["ended_at"] = datetime.datetime.now().isoformat()
+            call["log"]["duration_seconds"] = int(duration) if duration and duration.isdigit() else None
+        if call["pending"]:
+            call["pending"]["future"].cancel()
+        save_call_logs()
+        logger.info(f"Call {call_sid} ended ({call['log']['status']}) after {len(call['log']['turns'])} turns")
+    return "OK"
+
+def voice_stats():
+    with VOICE_CALLS_LOCK:
+        active_calls = len(VOICE_CALLS)
+    with CALL_LOGS_LOCK:
+        answer_times = sorted(turn["answer_ms"] for call_log in CALL_LOGS for turn in call_log["turns"])
+        turns = sum(len(call_log["turns"]) for call_log in CALL_LOGS)
+        return {
+            "active_calls": active_calls,
+            "calls_logged": len(CALL_LOGS),
+            "identified_by_caller_id": sum(1 for call_log in CALL_LOGS if call_log["identified_by"] == "caller_id"),
+            "turns": turns,
+            "answer_ms_avg": round(sum(answer_times) / len(answer_times)) if answer_times else 0,
+            "answer_ms_p95": answer_times[int(0.95 * (len(answer_times) - 1))] if answer_times else 0,
+            "fillers_per_turn": round(sum(turn["fillers"] for call_log in CALL_LOGS for turn in call_log["turns"]) / turns, 2) if turns else 0
+        }
+
+# Asynchronous pipeline settings: when enabled, /sms hands each message to an asyncio engine and returns immediately,
+# so one process can hold hundreds of conversations waiting on Rent Manager, xAI and Twilio
+ASYNC_PIPELINE = os.getenv("ASYNC_PIPELINE", "False").lower() == "true"
+ASYNC_MAX_ACTIVE_CONVERSATIONS = int(os.getenv("ASYNC_MAX_ACTIVE_CONVERSATIONS", "500"))
+ASYNC_MAX_XAI_CALLS = int(os.getenv("ASYNC_MAX_XAI_CALLS", "32"))
+ASYNC_MAX_RENT_MANAGER_CALLS = int(os.getenv("ASYNC_MAX_RENT_MANAGER_CALLS", "8"))
+ASYNC_MAX_TWILIO_CALLS = int(os.getenv("ASYNC_MAX_TWILIO_CALLS", "16"))
+
+# Runs the SMS pipeline as coroutines on an event loop in a background thread.
+# Each phone number gets an actor task that coalesces its bursts and processes them in order.
+class AsyncMessageEngine:
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.start_lock = threading.Lock()
+        self.mailboxes = {}  # Maps phone_number to a MESSAGE_BURSTS burst plus an "arrived" asyncio.Event
+        self.actors = {}  # Maps phone_number to its actor task
+        self.in_flight = {}  # Maps coalescing key to the shared upstream task
+        self.http_session = None
+        self.twilio_client = None
+        self.messages_received = 0
+        self.calls_saved = 0
+
+    # Start the event loop thread on first use (after any gunicorn fork)
+    def ensure_started(self):
+        with self.start_lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            ready = threading.Event()
+
+            def run_loop():
+                self.loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self.loop)
+                self.conversation_slots = asyncio.Semaphore(ASYNC_MAX_ACTIVE_CONVERSATIONS)
+                self.xai_slots = asyncio.Semaphore(ASYNC_MAX_XAI_CALLS)
+                self.rent_manager_slots = asyncio.Semaphore(ASYNC_MAX_RENT_MANAGER_CALLS)
+                self.twilio_slots = asyncio.Semaphore(ASYNC_MAX_TWILIO_CALLS)
+                ready.set()
+                self.loop.run_forever()
+
+            self.thread = threading.Thread(target=run_loop, name="async-sms-engine", daemon=True)
+            self.thread.start()
+            ready.wait()
+            logger.info("Async SMS engine started")
+
+    # Called from Flask request threads
+    def submit(self, from_number, message):
+        self.ensure_started()
+        self.loop.call_soon_threadsafe(self._enqueue, from_number, message)
+
+    def _enqueue(self, from_number, message):
+        self.messages_received += 1
+        mailbox = self.mailboxes.get(from_number)
+        if mailbox is None:
+            mailbox = MESSAGE_BURSTS.open_burst(message)
+            mailbox["arrived"] = asyncio.Event()
+            self.mailboxes[from_number] = mailbox
         else:
-            reply += f" For immediate assistance, you can contact the park office at {PARK_OFFICE_PHONE}, available {PARK_OFFICE_HOURS}. Is there anything else I can assist you with?"
-        send_sms(from_number, reply)
-        CURRENT_CONVERSATIONS[from_number]["message_history"].append({"role": "bot", "content": reply})
+            MESSAGE_BURSTS.add_to_burst(mailbox, message)
+        mailbox["arrived"].set()
+        if from_number not in self.actors:
+            self.actors[from_number] = self.loop.create_task(self._run_actor(from_number))
+
+    async def _run_actor(self, from_number):
+        try:
+            while from_number in self.mailboxes:
+                messages = await self._collect_burst(from_number)
+                if not await self.admit(from_number, messages):
+                    continue
+                try:
+                    async with self.conversation_slots:
+                        # The phone lock keeps the inactivity sweeper away while this tenant's messages are processed
+                        queue = await asyncio.to_thread(PHONE_LOCKS.acquire, from_number)
+                        try:
+                            await process_sms_async(self, from_number, messages)
+                        except Exception as e:
+                            logger.error(f"Error processing messages from {from_number} in async engine: {str(e)}")
+                        finally:
+                            PHONE_LOCKS.release(from_number, queue)
+                finally:
+                    ADMISSION.release()
+        finally:
+            self.actors.pop(from_number, None)
+
+    # Wait for an admission slot; returns False if the message had to be dropped
+    async def wait_for_admission(self, priority, timeout, deferred=False):
+        granted = self.loop.create_future()
+
+        def grant():
+            self.loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(True))
+
+        waiter = ADMISSION.submit(priority, grant, deferred=deferred)
+        if waiter is None:
+            return False
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return not ADMISSION.cancel(waiter)
+
+    # Admit a burst by priority; past its class's wait limit it gets a holding reply and keeps waiting in its class
+    # (urgent maintenance is logged and the owner paged first). The actor handles one burst at a time, so the
+    # tenant's later messages stay behind it
+    async def admit(self, from_number, messages):
+        priority = message_priority(" ".join(messages))
+        if await self.wait_for_admission(priority, ADMISSION_MAX_WAIT_SECONDS[priority]):
+            return True
+        if priority == "emergency":
+            await asyncio.to_thread(page_urgent_maintenance_now, from_number, messages)
+        logger.warning(f"Deferring {priority} message from {from_number} under load")
+        ADMISSION.note_deferred(priority)
+        language = await asyncio.to_thread(message_language, from_number, messages)
+        try:
+            await self.send_sms(from_number, holding_reply_text(language))
+        except Exception as e:
+            logger.error(f"Failed to send holding reply to {from_number}: {str(e)}")
+        if await self.wait_for_admission(priority, None, deferred=True):
+            return True
+        logger.error(f"Dropping deferred message from {from_number}: deferred queue is full")
+        try:
+            await self.send_sms(from_number, overloaded_text(language))
+        except Exception as e:
+            logger.error(f"Failed to send overload notice to {from_number}: {str(e)}")
+        return False
+
+    # Wait out the burst window (the threaded coalescer's policy) and take the collected messages
+    async def _collect_burst(self, from_number):
+        mailbox = self.mailboxes[from_number]
+        remaining = MESSAGE_BURSTS.seconds_left(mailbox)
+        while remaining > 0:
+            mailbox["arrived"].clear()
+            try:
+                await asyncio.wait_for(mailbox["arrived"].wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+            remaining = MESSAGE_BURSTS.seconds_left(mailbox)
+        del self.mailboxes[from_number]
+        return MESSAGE_BURSTS.close_burst(mailbox)
+
+    # Concurrent awaiters of the same key share one upstream task
+    async def coalesce(self, key, factory, timeout):
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            self.calls_saved += 1
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+
+    def get_http_session(self):
+        if self.http_session is None:
+            self.http_session = aiohttp.ClientSession()
+        return self.http_session
+
+    async def fetch_tenant_transactions(self, tenant_id):
+        url, headers, params = tenant_transactions_request(tenant_id)
+        async with self.rent_manager_slots:
+            token = await asyncio.to_thread(RENT_MANAGER_SESSION.get_token)
+            try:
+                if not token:
+                    raise RentManagerAuthError("Failed to authenticate with Rent Manager.")
+                for attempt in range(RENT_MANAGER_REQUEST_ATTEMPTS):
+                    headers["X-RM12Api-ApiToken"] = token
+                    logger.info(f"Fetching transactions for TenantID={tenant_id} from {url} (async)")
+                    async with self.get_http_session().get(url, headers=headers, params=params, timeout=aiohttp.ClientTimeout(total=60)) as response:
+                        logger.info(f"Transaction Fetch Response Status (TenantID={tenant_id}): {response.status}")
+                        if response.status == 401:
+                            retry_token = await asyncio.to_thread(RENT_MANAGER_SESSION.token_after_unauthorized, url, token, attempt)
+                            if retry_token:
+                                token = retry_token
+                                continue
+                        response.raise_for_status()
+                        body = await response.read()
+                        RENT_MANAGER_TRANSFERS.record("transactions", response.content_length, len(body))
+                        transactions, last_payment_date = summarize_transactions(json.loads(body))
+                        logger.info(f"Fetched {len(transactions)} transactions for TenantID={tenant_id}")
+                        return transactions, last_payment_date
+            except (aiohttp.ClientError, asyncio.TimeoutError, RentManagerAuthError) as e:
+                logger.error(f"Error fetching transactions for TenantID={tenant_id}: {str(e)}")
+            except ValueError as e:
+                logger.error(f"Invalid transactions response for TenantID={tenant_id}: {str(e)}")
+            return None, None
+
+    async def load_tenant_financials(self, tenant_id):
+        try:
+            transactions, last_payment_date = await self.coalesce(
+                ("transactions", tenant_id),
+                lambda: self.fetch_tenant_transactions(tenant_id),
+                TRANSACTIONS_COALESCE_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"Timed out waiting for transactions for TenantID={tenant_id}")
+            transactions, last_payment_date = None, None
+        return tenant_financials(list(transactions) if transactions is not None else None, last_payment_date)
+
+    # Prefetches go through TRANSACTION_PREFETCH (same cap, TTL, serve-once rule and metrics as the threaded path),
+    # with the fetch itself running on this event loop
+    def start_prefetch(self, tenant_id, phone_number):
+        TRANSACTION_PREFETCH.start(tenant_id, phone_number, submit=lambda: asyncio.run_coroutine_threadsafe(self.load_tenant_financials(tenant_id), self.loop))
+
+    async def get_financials(self, tenant_id, fresh=False):
+        future = TRANSACTION_PREFETCH.take(tenant_id, fresh)
+        if future is None:
+            return await self.load_tenant_financials(tenant_id)
+        return copy_financials(await asyncio.wrap_future(future))
+
+    async def get_ai_response(self, user_input, tenant_data, conversation_language, message_history=None, is_maintenance_request=False, include_transactions=True, check_for_end=False):
+        start_time = datetime.datetime.now()
+        payload = build_xai_payload(user_input, tenant_data, conversation_language, message_history, include_transactions, check_for_end)
+
+        async def post_to_xai():
+            async with self.xai_slots:
+                xai_start_time = datetime.datetime.now()
+                succeeded = False
+                try:
+                    async with self.get_http_session().post(XAI_API_URL, headers=xai_headers(), json=payload, timeout=aiohttp.ClientTimeout(total=60)) as response:
+                        if response.status >= 400:
+                            raise Exception(f"HTTPError in call_xai: Status Code: {response.status}, Response Text: {await response.text()}")
+                        result = await response.json(content_type=None)
+                    succeeded = True
+                    return result
+                finally:
+                    record_xai_latency(xai_start_time, succeeded)
+
+        @retry_xai_call
+        async def call_xai():
+            try:
+                return await self.coalesce(xai_coalescing_key(payload), post_to_xai, XAI_COALESCE_TIMEOUT_SECONDS)
+            except Exception as e:
+                logger.error(f"Error in async call_xai: {str(e)}")
+                raise
+
+        try:
+            response = await call_xai()
+            logger.info(f"get_ai_response completed in {(datetime.datetime.now() - start_time).total_seconds() * 1000:.2f} ms")
+            return extract_ai_reply(response, check_for_end)
+        except Exception as e:
+            logger.error(f"Error in async get_ai_response after retries: {str(e)}")
+            return fallback_ai_response(user_input, tenant_data, conversation_language, is_maintenance_request, check_for_end)
+
+    async def send_sms(self, to_number, message):
+        logger.info(f"Preparing to send SMS to {to_number}: {message}")
+        if TESTING_MODE:
+            logger.info(f"TESTING_MODE enabled: SMS not sent. Would have sent to {to_number}: {message}")
+            return
+        if self.twilio_client is None:
+            self.twilio_client = Client(TWILIO_SID, TWILIO_TOKEN, http_client=AsyncTwilioHttpClient())
+        sender = {"messaging_service_sid": MESSAGING_SID} if MESSAGING_SID else {"from_": TWILIO_NUMBER}
+        try:
+            async with self.twilio_slots:
+                response = await self.twilio_client.messages.create_async(body=message, to=to_number, **sender)
+            logger.info(f"SMS sent successfully: {response.sid}")
+        except Exception as e:
+            logger.error(f"Error sending SMS to {to_number}: {str(e)}")
+            raise
+
+    def stats(self):
+        return {
+            "enabled": ASYNC_PIPELINE,
+            "running": self.thread is not None and self.thread.is_alive(),
+            "messages_received": self.messages_received,
+            "active_conversations": len(self.actors),
+            "calls_saved": self.calls_saved
+        }
+
+ASYNC_ENGINE = AsyncMessageEngine()
+
+# Coroutine version of process_sms: the shared steps run in worker threads, upstream calls on the engine
+async def process_sms_async(engine, from_number, messages):
+    notice, message, reply_prefix = await asyncio.to_thread(prepare_reply, from_number, messages, engine.start_prefetch)
+    if notice:
+        await engine.send_sms(from_number, notice)
+        record_message(from_number, "bot", notice)
+        await asyncio.to_thread(save_conversations)
+        return
+
+    conversation_language = message_language(from_number, messages)
+    message_history = CURRENT_CONVERSATIONS[from_number]["message_history"]
+    try:
+        tenant_key = conversation_tenant_key(from_number)
+        financials = await engine.get_financials(tenant_key[0], fresh=is_payment_question(message)) if needs_transactions(tenant_key, message) else None
+        tenant_data = tenant_data_for_query(tenant_key, message, financials)
+    except Exception as e:
+        error_msg = tenant_data_error_text(from_number, e)
+        await engine.send_sms(from_number, error_msg)
+        record_message(from_number, "bot", error_msg)
+        await asyncio.to_thread(save_conversations)
+        return
+
+    if is_maintenance_request(message):
+        maintenance_request, is_duplicate, owner_message = await asyncio.to_thread(log_maintenance_request, from_number, tenant_key, message)
+        # Page the owner while the tenant's reply is being generated
+        pending = [engine.send_sms(OWNER_PHONE, owner_message)] if owner_message else []
+        if not is_duplicate:
+            tenant_data = maintenance_tenant_data(tenant_data, maintenance_request)
+            pending.append(engine.get_ai_response(message, tenant_data, conversation_language, message_history, is_maintenance_request=True, include_transactions=False))
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        if owner_message:
+            await asyncio.to_thread(note_owner_page, maintenance_request, tenant_key, results[0] if isinstance(results[0], Exception) else None)
+        if is_duplicate:
+            reply = maintenance_duplicate_text(conversation_language, maintenance_request)
+        else:
+            reply = results[-1]
+            if isinstance(reply, Exception):
+                raise reply
+        reply += maintenance_followup_text(conversation_language)
     else:
-        reply = get_ai_response(message, tenant_data, conversation_language, message_history, include_transactions=True)
-        send_sms(from_number, reply)
-        CURRENT_CONVERSATIONS[from_number]["message_history"].append({"role": "bot", "content": reply})
+        reply = await engine.get_ai_response(message, tenant_data, conversation_language, message_history, include_transactions=True)
+    reply = reply_prefix + reply
+    await engine.send_sms(from_number, reply)
+    record_message(from_number, "bot", reply)
 
     # Check if the tenant intends to end the conversation
-    intent = get_ai_response(message, tenant_data, conversation_language, message_history, check_for_end=True, include_transactions=False)
+    intent = await engine.get_ai_response(message, tenant_data, conversation_language, message_history, check_for_end=True, include_transactions=False)
     if "END_CONVERSATION" in intent:
-        if conversation_language == "es":
-            goodbye_msg = "¡Adiós! Si necesitas más ayuda, no dudes en contactarme."
-        else:
-            goodbye_msg = "Goodbye! Feel free to reach out if you need further assistance."
-        send_sms(from_number, goodbye_msg)
-        CURRENT_CONVERSATIONS[from_number]["message_history"].append({"role": "bot", "content": goodbye_msg})
-        del CURRENT_CONVERSATIONS[from_number]
-        if from_number in PENDING_IDENTIFICATION:
-            del PENDING_IDENTIFICATION[from_number]
+        goodbye_msg = goodbye_text(conversation_language)
+        await engine.send_sms(from_number, goodbye_msg)
+        record_message(from_number, "bot", goodbye_msg)
+        end_conversation(from_number)
         logger.info(f"Conversation ended for {from_number} based on AI intent detection")
-        save_conversations()
-    else:
-        save_conversations()
-    return "OK"
+    await asyncio.to_thread(save_conversations)
+
+# Background jobs: periodic work runs in one process per host (the first worker to take BACKGROUND_JOBS_LOCK_FILE),
+# started with the first request rather than at import. BACKGROUND_JOBS_ENABLED=false leaves it all to the cron endpoints.
+BACKGROUND_JOBS_ENABLED = os.getenv("BACKGROUND_JOBS_ENABLED", "true").lower() == "true"
+BACKGROUND_JOBS_LOCK_FILE = "background_jobs.lock"
+BACKGROUND_JOBS_LOCK = None  # Open lock file held for the life of the process that runs the jobs
+BACKGROUND_JOBS_START_LOCK = threading.Lock()
+
+# Run job() every interval_minutes on a daemon thread, starting now
+def run_every(name, interval_minutes, job):
+    def run_forever():
+        while True:
+            try:
+                job()
+            except Exception as e:
+                logger.error(f"Background job {name} failed: {str(e)}")
+            time.sleep(interval_minutes * 60)
+
+    threading.Thread(target=run_forever, name=name, daemon=True).start()
+    logger.info(f"Background job {name} runs every {interval_minutes} minutes")
+
+def start_background_jobs():
+    global BACKGROUND_JOBS_LOCK
+    if not BACKGROUND_JOBS_ENABLED:
+        return
+    with BACKGROUND_JOBS_START_LOCK:
+        if BACKGROUND_JOBS_LOCK is not None:
+            return
+        lock_file = open(BACKGROUND_JOBS_LOCK_FILE, "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            logger.info("Background jobs are running in another process")
+            BACKGROUND_JOBS_LOCK = False
+            return
+        BACKGROUND_JOBS_LOCK = lock_file
+    run_every("maintenance-digest", MAINTENANCE_DIGEST_CHECK_MINUTES, send_maintenance_digest)
+    if FINANCIAL_SUMMARY_REFRESH_INTERVAL_MINUTES > 0:
+        run_every("financial-summary-batch", FINANCIAL_SUMMARY_REFRESH_INTERVAL_MINUTES, FINANCIAL_SUMMARIES.run_batch)
+
+@app.before_first_request
+def start_background_jobs_on_first_request():
+    start_background_jobs()
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app persists conversations, bindings and logs to the working directory, so import it from a scratch directory
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    os.chdir(tmp_path_factory.mktemp("parkbot"))
+    os.environ["BACKGROUND_JOBS_ENABLED"] = "false"
+    import app
+    return app
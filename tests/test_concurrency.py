@@ -0,0 +1,92 @@
+import collections
+import datetime
+import threading
+
+import pytest
+
+PHONES = [f"+1555010{i:04d}" for i in range(5)]
+MESSAGES_PER_PHONE = 20
+SENDER_THREADS = 8
+
+# Active conversations for identified tenants, with unbounded histories so every recorded message can be counted
+@pytest.fixture
+def conversations(app_module, monkeypatch):
+    tenants = {}
+    for index, phone_number in enumerate(PHONES):
+        tenant_key = (f"T{index}", f"Tenant{index}", "Test", f"lot{index}")
+        tenants[tenant_key] = {"tenant_id": tenant_key[0], "balance": "$0", "park": {"name": "Shady Nook"}, "address": {"city": "Covington"}, "phone_numbers": []}
+        app_module.CURRENT_CONVERSATIONS[phone_number] = {
+            "tenant_key": tenant_key,
+            "last_message_time": datetime.datetime.now(),
+            "pending_end": False,
+            "pending_identification": False,
+            "language": "en",
+            "initial_language": "en",
+            "message_history": collections.deque()
+        }
+    monkeypatch.setattr(app_module, "TENANTS", tenants)
+    monkeypatch.setattr(app_module.MESSAGE_BURSTS, "window_seconds", 0)
+    monkeypatch.setitem(app_module.ADMISSION_MAX_WAIT_SECONDS, "normal", 60)
+    yield app_module.CURRENT_CONVERSATIONS
+    for phone_number in PHONES:
+        app_module.end_conversation(phone_number)
+
+def test_concurrent_webhooks_keep_every_message(app_module, conversations, monkeypatch):
+    active = collections.Counter()
+    overlaps = []
+    lock = threading.Lock()
+
+    def fake_ai_response(user_input, tenant_data, conversation_language, message_history=None, check_for_end=False, **kwargs):
+        if check_for_end:
+            return "CONTINUE"
+        phone_number = PHONES[int(tenant_data["tenant_id"][1:])]
+        with lock:
+            active[phone_number] += 1
+            if active[phone_number] > 1:
+                overlaps.append(phone_number)
+        threading.Event().wait(0.002)
+        with lock:
+            active[phone_number] -= 1
+        return f"reply to {user_input}"
+
+    monkeypatch.setattr(app_module, "get_ai_response", fake_ai_response)
+    monkeypatch.setattr(app_module, "send_sms", lambda to_number, message: None)
+
+    webhooks = [(phone_number, f"question {n} from {phone_number}") for n in range(MESSAGES_PER_PHONE) for phone_number in PHONES]
+    errors = []
+    done = threading.Event()
+
+    def send(batch):
+        client = app_module.app.test_client()
+        for index, (phone_number, body) in batch:
+            response = client.post("/sms", data={"From": phone_number, "Body": body, "MessageSid": f"SM{index}"})
+            if response.status_code != 200:
+                errors.append((body, response.status_code))
+
+    # The inactivity sweeper runs alongside the webhooks, as the cron job would
+    def sweep():
+        client = app_module.app.test_client()
+        while not done.is_set():
+            client.get("/check_inactive_conversations")
+
+    indexed = list(enumerate(webhooks))
+    senders = [threading.Thread(target=send, args=(indexed[i::SENDER_THREADS],)) for i in range(SENDER_THREADS)]
+    sweeper = threading.Thread(target=sweep)
+    sweeper.start()
+    for sender in senders:
+        sender.start()
+    for sender in senders:
+        sender.join()
+    done.set()
+    sweeper.join()
+
+    assert errors == []
+    assert overlaps == []
+    for phone_number in PHONES:
+        history = list(conversations[phone_number]["message_history"])
+        user_messages = [entry["content"] for entry in history if entry["role"] == "user"]
+        assert sorted(user_messages) == sorted(body for number, body in webhooks if number == phone_number)
+        # Each message is answered before the next one from the same phone is recorded
+        assert [entry["role"] for entry in history] == ["user", "bot"] * MESSAGES_PER_PHONE
+        assert all(entry["content"] == f"reply to {previous['content']}" for previous, entry in zip(history[::2], history[1::2]))
+    assert app_module.PHONE_LOCKS.queues == {}
@@ -0,0 +1,19 @@
+import datetime
+
+RENT_CHANGE = [
+    {"TransactionDate": "2026-08-01T00:00:00", "Comment": "Lot rent", "TransactionType": "Charge", "Amount": "400"},
+    {"TransactionDate": "2026-09-01T00:00:00", "Comment": "Lot rent", "TransactionType": "Charge", "Amount": "550"},
+    {"TransactionDate": "2026-09-03T00:00:00", "Comment": "", "TransactionType": "Payment", "Amount": "-550"}
+]
+
+def test_newest_rent_charge_wins_in_any_order(app_module):
+    assert app_module.infer_monthly_rent_charge(RENT_CHANGE) == 550.0
+    assert app_module.infer_monthly_rent_charge(list(reversed(RENT_CHANGE))) == 550.0
+
+def test_prompt_and_summary_agree_after_rent_change(app_module):
+    tenant_data = {"tenant_id": "T1", "balance": "$0.00", "park": {"name": "Shady Nook"}, "transactions": RENT_CHANGE}
+    summary = app_module.summarize_tenant_financials(tenant_data, RENT_CHANGE, "2026-09-03", datetime.date(2026, 9, 10))
+    payload = app_module.build_xai_payload("what is my rent", tenant_data, "en", include_transactions=True)
+    prompt = payload["messages"][1]["content"]
+    assert summary["monthly_rent_charge"] == 550.0
+    assert "Monthly rent charge (if available): $550.00" in prompt
@@ -0,0 +1,39 @@
+import pytest
+
+JOHN = ("T1", "John", "Doe", "lot7")
+
+@pytest.fixture
+def roster(app_module, monkeypatch):
+    tenants = {JOHN: {"tenant_id": "T1", "balance": "$120.00", "due_date": "1", "park": {"name": "Shady Nook"}, "address": {"city": "Covington"}, "phone_numbers": []}}
+    monkeypatch.setattr(app_module, "TENANTS", tenants)
+    monkeypatch.setattr(app_module, "TENANT_KEYS_BY_ID", {"T1": JOHN})
+    monkeypatch.setattr(app_module, "bind_phone_to_tenant", lambda *args, **kwargs: None)
+    monkeypatch.setattr(app_module.TRANSACTION_PREFETCH, "start", lambda *args, **kwargs: None)
+    monkeypatch.setattr(app_module.TRANSACTION_PREFETCH, "get", lambda *args, **kwargs: {"transactions": [], "last_payment_date": None, "monthly_rent_charge": None})
+    return tenants
+
+def test_question_in_identifying_burst_is_answered(app_module, roster, monkeypatch):
+    phone_number = "+15550200001"
+    questions = []
+    sent = []
+
+    def fake_ai_response(user_input, tenant_data, conversation_language, message_history=None, check_for_end=False, **kwargs):
+        if check_for_end:
+            return "CONTINUE"
+        questions.append(user_input)
+        return "Your balance is $120.00."
+
+    monkeypatch.setattr(app_module, "get_ai_response", fake_ai_response)
+    monkeypatch.setattr(app_module, "send_sms", lambda to_number, message: sent.append(message))
+    try:
+        app_module.process_sms(phone_number, ["this is john doe", "what is my balance?"])
+    finally:
+        app_module.end_conversation(phone_number)
+
+    assert questions == ["what is my balance?"]
+    assert "Your balance is $120.00." in sent[-1]
+
+def test_joined_burst_keeps_questions(app_module, roster):
+    tenant_key, _, questions = app_module.identify_tenant_from_messages(["hi", "this is john doe", "lot 7", "is the water off?"])
+    assert tenant_key == JOHN
+    assert questions == ["is the water off?"]
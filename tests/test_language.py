@@ -0,0 +1,55 @@
+import collections
+import datetime
+
+import pytest
+
+@pytest.mark.parametrize("message", ["no", "No.", "yes", "Sure", "ok", "no thanks", "no gracias"])
+def test_short_replies_never_switch_language(app_module, message):
+    assert app_module.detect_language_switch(message, "en") is None
+    assert app_module.detect_language_switch(message, "es") is None
+
+@pytest.mark.parametrize("message", ["no", "yes", "Sure"])
+def test_bare_replies_do_not_score_as_spanish(app_module, message):
+    assert app_module.detect_language(message)[0] == "en"
+
+def test_clear_switch_is_followed(app_module):
+    assert app_module.detect_language_switch("cual es mi saldo", "en") == "es"
+    assert app_module.detect_language_switch("what is my balance", "es") == "en"
+
+def test_no_keeps_english_conversation(app_module, monkeypatch):
+    phone_number = "+15550300001"
+    monkeypatch.setattr(app_module, "save_conversations", lambda: None)
+    app_module.CURRENT_CONVERSATIONS[phone_number] = {
+        "tenant_key": None,
+        "last_message_time": datetime.datetime.now(),
+        "pending_end": False,
+        "pending_identification": False,
+        "language": "en",
+        "initial_language": "en",
+        "message_history": collections.deque()
+    }
+    try:
+        assert app_module.update_conversation_language(phone_number, "No.") == "en"
+    finally:
+        app_module.CURRENT_CONVERSATIONS.pop(phone_number, None)
+
+def test_voice_no_says_goodbye_in_english(app_module):
+    call_sid = "CA-language-test"
+    call = {
+        "from_number": "+15550300002",
+        "tenant_key": ("T1", "John", "Doe", "lot7"),
+        "language": "en",
+        "message_history": collections.deque(maxlen=5),
+        "identify_attempts": 0,
+        "pending": None,
+        "log": {"started_at": datetime.datetime.now().isoformat(), "turns": []}
+    }
+    with app_module.VOICE_CALLS_LOCK:
+        app_module.VOICE_CALLS[call_sid] = call
+    try:
+        response = app_module.app.test_client().post("/voice/respond", data={"CallSid": call_sid, "SpeechResult": "No."})
+    finally:
+        with app_module.VOICE_CALLS_LOCK:
+            app_module.VOICE_CALLS.pop(call_sid, None)
+    assert call["language"] == "en"
+    assert app_module.voice_goodbye_text("en") in response.get_data(as_text=True)